@@ -0,0 +1,287 @@
+"""Двухуровневый кэш: LRU в памяти процесса перед общим хранилищем.
+
+LOCATION — алиас общего кэша из settings.CACHES (файлы, база, Redis и
+т.д.). Каждая запись в общий кэш публикует в нём сообщение об
+инвалидации, по которому остальные процессы выкидывают свои копии.
+Номера сообщений и поколения лент выдаёт incr общего кэша, поэтому он
+должен быть атомарным между процессами и не трогать срок жизни ключа:
+для файлов это SharedFileCache.
+"""
+import os
+import pickle
+import tempfile
+import time
+import zlib
+from collections import OrderedDict
+from threading import Lock
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+
+SEQUENCE_KEY = 'two-tier:sequence'
+MESSAGE_KEY = 'two-tier:message:{}'
+
+_tiers = {}
+_tiers_lock = Lock()
+_missing = object()
+
+
+class LocalTier:
+    """Ограниченный LRU текущего процесса и его позиция в канале."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.seen = None
+        self.checked = 0
+
+
+class SharedFileCache(FileBasedCache):
+    """Файловый кэш с атомарными между процессами add и incr.
+
+    У FileBasedCache incr — это get и set: параллельные процессы теряют
+    приращения, а set ставит таймаут по умолчанию даже ключам без срока.
+    Здесь incr держит эксклюзивную блокировку файла ключа, сохраняет его
+    срок и подменяет файл целиком, чтобы читатели без блокировки не
+    видели недописанное значение. add создаёт файл жёсткой ссылкой,
+    которая не перезаписывает чужой.
+    """
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if self.has_key(key, version):
+            return False
+        self._createdir()
+        fname = self._key_to_file(key, version)
+        self._cull()
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                self._write_content(f, timeout, value)
+            os.link(tmp_path, fname)
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(tmp_path)
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        fname = self._key_to_file(key, version)
+        while True:
+            try:
+                f = open(fname, 'rb')
+            except FileNotFoundError:
+                raise ValueError("Key '%s' not found" % key)
+            with f:
+                locks.lock(f, locks.LOCK_EX)
+                try:
+                    # Пока ждали блокировку, файл могли подменить.
+                    if not self._is_current(f, fname):
+                        continue
+                    try:
+                        expiry = pickle.load(f)
+                    except EOFError:
+                        expiry = 0
+                    if expiry is not None and expiry < time.time():
+                        raise ValueError("Key '%s' not found" % key)
+                    value = pickle.loads(zlib.decompress(f.read())) + delta
+                    self._replace(fname, expiry, value)
+                    return value
+                finally:
+                    locks.unlock(f)
+
+    @staticmethod
+    def _is_current(f, fname):
+        try:
+            return os.fstat(f.fileno()).st_ino == os.stat(fname).st_ino
+        except FileNotFoundError:
+            return False
+
+    def _replace(self, fname, expiry, value):
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                f.write(pickle.dumps(expiry, self.pickle_protocol))
+                f.write(zlib.compress(
+                    pickle.dumps(value, self.pickle_protocol)
+                ))
+            os.replace(tmp_path, fname)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+class TwoTierCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = location
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 60)
+        self._poll_interval = options.get('POLL_INTERVAL', 1)
+        self._max_backlog = options.get('MAX_BACKLOG', 1000)
+        self._message_timeout = options.get('MESSAGE_TIMEOUT', 300)
+        with _tiers_lock:
+            self._tier = _tiers.setdefault(location, LocalTier())
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    # Канал инвалидации
+
+    def _publish(self, keys):
+        try:
+            number = self.shared.incr(SEQUENCE_KEY)
+        except ValueError:
+            self.shared.add(SEQUENCE_KEY, 0, None)
+            number = self.shared.incr(SEQUENCE_KEY)
+        self.shared.set(
+            MESSAGE_KEY.format(number),
+            keys,
+            self._message_timeout
+        )
+
+    def _sync(self):
+        tier = self._tier
+        now = time.monotonic()
+        if now - tier.checked < self._poll_interval:
+            return
+        tier.checked = now
+        number = self.shared.get(SEQUENCE_KEY, 0)
+        seen = tier.seen
+        tier.seen = number
+        if seen is None or number == seen:
+            return
+        backlog = range(seen + 1, number + 1)
+        if number < seen or len(backlog) > self._max_backlog:
+            self._clear_local()
+            return
+        messages = self.shared.get_many(
+            [MESSAGE_KEY.format(position) for position in backlog]
+        )
+        if len(messages) < len(backlog):
+            self._clear_local()
+            return
+        with tier.lock:
+            for keys in messages.values():
+                for key in keys:
+                    tier.entries.pop(key, None)
+
+    # Локальный уровень
+
+    def _clear_local(self):
+        with self._tier.lock:
+            self._tier.entries.clear()
+
+    def _get_local(self, key):
+        tier = self._tier
+        with tier.lock:
+            entry = tier.entries.get(key)
+            if entry is None:
+                return _missing
+            expires, pickled = entry
+            if expires <= time.time():
+                del tier.entries[key]
+                return _missing
+            tier.entries.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def _set_local(self, key, value, timeout=DEFAULT_TIMEOUT):
+        expires = time.time() + self._local_timeout
+        backend_timeout = self.get_backend_timeout(timeout)
+        if backend_timeout is not None:
+            expires = min(expires, backend_timeout)
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        tier = self._tier
+        with tier.lock:
+            tier.entries[key] = (expires, pickled)
+            tier.entries.move_to_end(key)
+            while len(tier.entries) > self._max_entries:
+                tier.entries.popitem(last=False)
+
+    def _delete_local(self, keys):
+        with self._tier.lock:
+            for key in keys:
+                self._tier.entries.pop(key, None)
+
+    # API кэша Django
+
+    def get(self, key, default=None, version=None):
+        self._sync()
+        local_key = self.make_key(key, version=version)
+        value = self._get_local(local_key)
+        if value is _missing:
+            value = self.shared.get(key, _missing, version=version)
+            if value is _missing:
+                return default
+            self._set_local(local_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._sync()
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._get_local(self.make_key(key, version=version))
+            if value is _missing:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            shared = self.shared.get_many(missing, version=version)
+            for key, value in shared.items():
+                self._set_local(self.make_key(key, version=version), value)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._changed([key], version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        self._changed(list(data), version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._changed([key], version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        touched = self.shared.touch(key, timeout, version=version)
+        self._delete_local([self.make_key(key, version=version)])
+        return touched
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self._changed([key], version)
+        return value
+
+    def delete(self, key, version=None):
+        self.shared.delete(key, version=version)
+        self._changed([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.shared.delete_many(keys, version=version)
+        self._changed(keys, version)
+
+    def has_key(self, key, version=None):
+        self._sync()
+        if self._get_local(self.make_key(key, version=version)) is _missing:
+            return self.shared.has_key(key, version=version)
+        return True
+
+    def clear(self):
+        self.shared.clear()
+        self._clear_local()
+
+    def _changed(self, keys, version):
+        local_keys = [self.make_key(key, version=version) for key in keys]
+        self._delete_local(local_keys)
+        self._publish(local_keys)
@@ -0,0 +1,165 @@
+"""Раздача файлов MEDIA_ROOT в продакшене.
+
+Если перед Django стоит nginx или Apache, файл отдаёт веб-сервер по
+заголовку X-Accel-Redirect или X-Sendfile. Иначе файл уходит через
+FileResponse: WSGI-сервер с wsgi.file_wrapper отправит его sendfile
+без копирования через Python. Поддерживаются одиночные диапазоны Range.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified
+)
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+from sorl.thumbnail.conf import settings as sorl_settings
+
+from .storage import CONTENT_NAME
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+YEAR = 60 * 60 * 24 * 365
+
+
+class FileRange:
+    """Файл, который читается только в пределах диапазона."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def seek(self, *args):
+        return self.file.seek(*args)
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """(start, end) для заголовка Range, None — отдать файл целиком.
+
+    Несколько диапазонов сразу не поддерживаются и тоже дают None.
+    Невыполнимый диапазон поднимает ValueError.
+    """
+    match = RANGE.match(header or '')
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def is_immutable(path):
+    """Содержимое по этому имени никогда не меняется."""
+    return bool(
+        CONTENT_NAME.search(path)
+        or path.startswith(sorl_settings.THUMBNAIL_PREFIX)
+    )
+
+
+def offload(path, fullpath, content_type):
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_PREFIX + quote(path)
+        )
+    else:
+        response['X-Sendfile'] = fullpath
+    return response
+
+
+def file_response(request, fullpath, size, content_type):
+    try:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    file = open(fullpath, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(
+            FileRange(file, start, length),
+            status=206,
+            content_type=content_type
+        )
+        response['Content-Length'] = length
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def serve(request, path):
+    """Файл из MEDIA_ROOT с заголовками кэширования."""
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('Файл не найден')
+    if not os.path.isfile(fullpath):
+        raise Http404('Файл не найден')
+    if not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'),
+        stat.st_mtime,
+        stat.st_size
+    ):
+        return HttpResponseNotModified()
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+    if settings.MEDIA_SENDFILE:
+        response = offload(path, fullpath, content_type)
+    else:
+        response = file_response(request, fullpath, stat.st_size, content_type)
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if is_immutable(path):
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=YEAR,
+            immutable=True
+        )
+    else:
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.MEDIA_MAX_AGE
+        )
+    return response
@@ -0,0 +1,44 @@
+import hashlib
+import os
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Имя, выданное хранилищем по хэшу, в том числе с суффиксом производного
+# файла вроде _480w.
+CONTENT_NAME = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{64}[^/]*$')
+
+
+def content_name(name, content):
+    """Имя файла из SHA-256 содержимого: <каталог>/ab/abcd….<расширение>."""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    directory, filename = posixpath.split(name)
+    extension = os.path.splitext(filename)[1].lower()
+    hexdigest = digest.hexdigest()
+    return posixpath.join(directory, hexdigest[:2], hexdigest + extension)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, где имя файла — хэш его содержимого.
+
+    Одинаковые загрузки получают одно имя и один файл на диске, а значит
+    и общие миниатюры.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = content_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
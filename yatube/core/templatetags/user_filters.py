@@ -5,3 +5,8 @@ register = template.Library()
 @register.filter
 def addclass(field, css):
     return field.as_widget(attrs={'class': css})
+
+
+@register.filter
+def elided_page_range(page):
+    return page.paginator.get_elided_page_range(page.number)
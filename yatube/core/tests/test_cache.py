@@ -0,0 +1,131 @@
+import multiprocessing
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from django.utils.module_loading import import_string
+
+from core.cache import LocalTier
+from posts import caching
+
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': 'test-shared',
+        'OPTIONS': {'MAX_ENTRIES': 2, 'POLL_INTERVAL': 0},
+    },
+    'test-shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-shared',
+    },
+}
+
+
+@override_settings(CACHES=CACHES)
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches['default']
+        self.shared = caches['test-shared']
+        self.cache.clear()
+        # Второй «процесс»: свой локальный уровень над тем же хранилищем.
+        self.other = caches['default'].__class__(
+            'test-shared', CACHES['default']
+        )
+        self.other._tier = LocalTier()
+
+    def test_reads_are_served_from_local_tier(self):
+        self.cache.set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.shared.set('key', 'changed behind the back')
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_local_tier_is_bounded(self):
+        for key in ('a', 'b', 'c'):
+            self.cache.set(key, key)
+            self.cache.get(key)
+        self.assertEqual(len(self.cache._tier.entries), 2)
+        self.assertEqual(self.cache.get('a'), 'a')
+
+    def test_writes_evict_copies_in_other_processes(self):
+        """Удаление в общем кэше выкидывает копии из чужих LRU."""
+        self.other.get('missing')
+        self.cache.set('key', 'old')
+        self.assertEqual(self.other.get('key'), 'old')
+        self.cache.set('key', 'new')
+        self.assertEqual(self.other.get('key'), 'new')
+        self.cache.delete('key')
+        self.assertIsNone(self.other.get('key'))
+        self.cache.set('counter', 1)
+        self.assertEqual(self.other.get('counter'), 1)
+        self.cache.incr('counter')
+        self.assertEqual(self.other.get_many(['counter']), {'counter': 2})
+
+
+def shared_backend(location):
+    """Общий уровень с тем же бэкендом, что в settings.CACHES."""
+    params = settings.CACHES['shared']
+    return import_string(params['BACKEND'])(location, params)
+
+
+def increment(location, times):
+    cache = shared_backend(location)
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SharedCacheTests(SimpleTestCase):
+    """incr настроенного общего кэша: поколения и канал инвалидации."""
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+        self.cache = shared_backend(self.location)
+
+    def later(self, seconds):
+        return mock.patch('time.time', return_value=time.time() + seconds)
+
+    def test_incr_keeps_expiry(self):
+        self.cache.add('forever', 1, None)
+        self.cache.add('short', 1, 10)
+        self.assertEqual(self.cache.incr('forever'), 2)
+        self.assertEqual(self.cache.incr('short'), 2)
+        with self.later(3600):
+            self.assertEqual(self.cache.get('forever'), 2)
+            self.assertIsNone(self.cache.get('short'))
+            with self.assertRaises(ValueError):
+                self.cache.incr('short')
+
+    def test_add_does_not_overwrite(self):
+        self.assertTrue(self.cache.add('key', 1, None))
+        self.assertFalse(self.cache.add('key', 2, None))
+        self.assertEqual(self.cache.get('key'), 1)
+
+    def test_concurrent_increments_are_not_lost(self):
+        self.cache.add('counter', 0, None)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=increment, args=(self.location, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_feed_generations_do_not_expire(self):
+        alias = settings.CACHES['default']['LOCATION']
+        shared = {**settings.CACHES[alias], 'LOCATION': self.location}
+        with override_settings(CACHES={**settings.CACHES, alias: shared}):
+            caching.bump('index')
+            caching.bump('index')
+            generation, = caching.generations('index')
+            with self.later(3600):
+                self.assertEqual(
+                    caches[alias].get(caching.GENERATION_KEY.format('index')),
+                    generation
+                )
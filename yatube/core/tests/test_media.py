@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from django.utils.http import http_date
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CONTENT_NAME = 'posts/ab/' + 'ab' * 32 + '.txt'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, MEDIA_SENDFILE=None)
+class ServeMediaTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name in ('posts/plain.txt', CONTENT_NAME):
+            path = os.path.join(TEMP_MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(b'0123456789')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_full_file(self):
+        response = self.client.get('/media/posts/plain.txt')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(
+            response['Cache-Control'],
+            f'public, max-age={settings.MEDIA_MAX_AGE}'
+        )
+
+    def test_range(self):
+        """Диапазон отдаётся ответом 206, невыполнимый — 416."""
+        cases = (
+            ('bytes=2-5', 206, b'2345', 'bytes 2-5/10'),
+            ('bytes=7-', 206, b'789', 'bytes 7-9/10'),
+            ('bytes=-3', 206, b'789', 'bytes 7-9/10'),
+            ('bytes=20-', 416, None, 'bytes */10'),
+        )
+        for header, status, body, content_range in cases:
+            with self.subTest(header=header):
+                response = self.client.get(
+                    '/media/posts/plain.txt',
+                    HTTP_RANGE=header
+                )
+                self.assertEqual(response.status_code, status)
+                self.assertEqual(response['Content-Range'], content_range)
+                if body is not None:
+                    self.assertEqual(
+                        b''.join(response.streaming_content),
+                        body
+                    )
+                    self.assertEqual(
+                        response['Content-Length'],
+                        str(len(body))
+                    )
+
+    def test_content_addressed_is_immutable(self):
+        response = self.client.get('/media/' + CONTENT_NAME)
+        self.assertEqual(
+            response['Cache-Control'],
+            'public, max-age=31536000, immutable'
+        )
+
+    def test_not_modified(self):
+        path = os.path.join(TEMP_MEDIA_ROOT, 'posts/plain.txt')
+        response = self.client.get(
+            '/media/posts/plain.txt',
+            HTTP_IF_MODIFIED_SINCE=http_date(os.stat(path).st_mtime)
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_outside_media_root(self):
+        for path in ('/media/../yatube/settings.py', '/media/posts/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
+
+    def test_offload(self):
+        """Веб-серверу передаётся путь к файлу, тело пустое."""
+        with self.settings(MEDIA_SENDFILE='x-accel-redirect'):
+            response = self.client.get('/media/posts/plain.txt')
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            settings.MEDIA_ACCEL_PREFIX + 'posts/plain.txt'
+        )
+        self.assertEqual(response.content, b'')
+        with self.settings(MEDIA_SENDFILE='x-sendfile'):
+            response = self.client.get('/media/posts/plain.txt')
+        self.assertEqual(
+            response['X-Sendfile'],
+            os.path.join(TEMP_MEDIA_ROOT, 'posts/plain.txt')
+        )
@@ -1,9 +1,23 @@
 from django.contrib import admin
 
+from . import search
 from .models import Post, Group, Comment, Follow
+from .utils import AdminPaginator
 
 
-class PostAdmin(admin.ModelAdmin):
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist, который не замедляется с ростом таблицы.
+
+    Полный COUNT(*) не считается: число строк и страницы ограничены
+    ADMIN_COUNT_LIMIT, см. AdminPaginator. Внешние ключи выбираются
+    автодополнением, а не списком всех строк.
+    """
+    paginator = AdminPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+class PostAdmin(LargeTableAdmin):
     list_display = (
         'pk',
         'text',
@@ -11,13 +25,44 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group',
     )
-    list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
+    # Варианты фильтра по дате фиксированы и не требуют запросов к таблице
     list_filter = ('pub_date',)
-    empty_value_display = '-пусто-'
+    date_hierarchy = 'pub_date'
+
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по полнотекстовому индексу вместо LIKE '%...%'."""
+        expression = search.match_expression(search_term)
+        if expression is None or not search.is_available():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(
+            id__in=search.matching_ids(expression)
+        ), False
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug')
+    search_fields = ('title', 'slug')
+
+
+class CommentAdmin(LargeTableAdmin):
+    list_display = ('pk', 'text', 'pub_date', 'author', 'post')
+    list_select_related = ('author', 'post')
+    autocomplete_fields = ('author', 'post')
+    date_hierarchy = 'pub_date'
+
+
+class FollowAdmin(LargeTableAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
 
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
-admin.site.register(Comment)
-admin.site.register(Follow)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
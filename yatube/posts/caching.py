@@ -0,0 +1,209 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.core.cache.utils import make_template_fragment_key
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Group, Post, User
+
+GENERATION_KEY = 'feed:generation:{}'
+MODIFIED_KEY = 'feed:modified:{}'
+COUNT_SCOPE = 'count:{}'
+COMMENTS_SCOPE = 'comments:{}'
+CARD_FRAGMENT = 'post_card'
+RESPONSE_KEY = 'feed:response:{}'
+PAGE_PARAMS = ('page', 'after', 'before')
+
+
+def feed_scopes(author_id, group_id):
+    """Ленты, в которые попадает пост автора в группе."""
+    scopes = ['index', f'author:{author_id}']
+    if group_id:
+        scopes.append(f'group:{group_id}')
+    return scopes
+
+
+def post_scopes(post_id, author_id, group_id):
+    """Страницы, на которых виден пост автора в группе."""
+    return feed_scopes(author_id, group_id) + [f'post:{post_id}']
+
+
+def comment_scopes(post_id, author_id, group_id):
+    """Что меняет комментарий к посту: страница поста и ETag лент.
+
+    Поколения самих лент не трогаются: число комментариев рисуется вне
+    закэшированных карточек.
+    """
+    return [f'post:{post_id}'] + [
+        COMMENTS_SCOPE.format(scope)
+        for scope in feed_scopes(author_id, group_id)
+    ]
+
+
+def _initial_generation():
+    # После вытеснения ключа счётчик не должен вернуться к старым значениям.
+    return int(time.time() * 1000)
+
+
+def generations(*scopes):
+    keys = [GENERATION_KEY.format(scope) for scope in scopes]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, _initial_generation(), None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def last_modified(*scopes):
+    keys = [MODIFIED_KEY.format(scope) for scope in scopes]
+    values = cache.get_many(keys)
+    now = int(time.time())
+    for key in keys:
+        if key not in values:
+            # Время изменения неизвестно: считаем, что страница новая.
+            cache.add(key, now, None)
+            values[key] = cache.get(key, now)
+    return max(values.values())
+
+
+def bump(*scopes):
+    now = int(time.time())
+    for scope in scopes:
+        key = GENERATION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_generation(), None)
+    cache.set_many({MODIFIED_KEY.format(scope): now for scope in scopes}, None)
+
+
+def bump_counts(*scopes):
+    """Сбрасывает число постов лент: пост в них появился или пропал.
+
+    Правки, комментарии и миниатюры меняют поколение ленты, но не число
+    её постов, поэтому у числа своё поколение.
+    """
+    bump(*[COUNT_SCOPE.format(scope) for scope in scopes])
+
+
+def card_cache_context(posts):
+    """Поколения постов страницы для ключей их закэшированных карточек."""
+    posts = list(posts or [])
+    scopes = [f'post:{post.id}' for post in posts]
+    for post, generation in zip(posts, generations(*scopes)):
+        post.generation = generation
+    return {'card_timeout': settings.FEED_CACHE_TIMEOUT}
+
+
+def uncached_cards(posts):
+    """Посты, карточек которых ещё нет в кэше фрагментов."""
+    keys = {
+        make_template_fragment_key(
+            CARD_FRAGMENT,
+            [post.id, getattr(post, 'generation', None)]
+        ): post
+        for post in posts
+    }
+    cached = cache.get_many(list(keys))
+    return [post for key, post in keys.items() if key not in cached]
+
+
+def cache_anonymous(validator):
+    """Условные ответы и кэш целых страниц для анонимных посетителей.
+
+    validator(request, *args, **kwargs) возвращает список областей
+    (scopes) страницы и дешёвые данные из базы для ETag или None, если
+    страницы нет и ответ должна сформировать сама view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            state = validator(request, *args, **kwargs)
+            if state is None:
+                return view(request, *args, **kwargs)
+            scopes, data = state
+            raw = ':'.join(
+                [request.get_full_path()]
+                + [str(gen) for gen in generations(*scopes)]
+                + [str(value) for value in data]
+            )
+            etag = hashlib.md5(raw.encode()).hexdigest()
+            modified = last_modified(*scopes)
+            response = get_conditional_response(
+                request,
+                etag=quote_etag(etag),
+                last_modified=modified
+            )
+            if response is None:
+                key = RESPONSE_KEY.format(etag)
+                response = cache.get(key)
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                    if response.status_code != 200:
+                        return response
+                    cache.set(key, response, settings.FEED_CACHE_TIMEOUT)
+            response['ETag'] = quote_etag(etag)
+            response['Last-Modified'] = http_date(modified)
+            return response
+        return wrapper
+    return decorator
+
+
+def latest(posts):
+    """Самый свежий пост ленты: дёшево по индексам (pub_date, id)."""
+    state = posts.aggregate(Max('pub_date'), Max('id'))
+    return state['pub_date__max'], state['id__max']
+
+
+def with_comments(*scopes):
+    """Области ленты вместе с числом комментариев её постов."""
+    return list(scopes) + [COMMENTS_SCOPE.format(scope) for scope in scopes]
+
+
+def index_state(request):
+    return with_comments('index'), latest(Post.objects.all())
+
+
+def popular_state(request):
+    # Список пересчитывает задача, а правки постов сбрасывают область index.
+    return ['popular'] + with_comments('index'), []
+
+
+def group_state(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'id', flat=True
+    ).first()
+    if group_id is None:
+        return None
+    posts = Post.objects.filter(group_id=group_id)
+    return with_comments(f'group:{group_id}'), latest(posts)
+
+
+def profile_state(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'id', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return (
+        with_comments(f'author:{author_id}') + [f'profile:{author_id}'],
+        latest(Post.objects.filter(author_id=author_id)),
+    )
+
+
+def post_state(request, post_id):
+    post = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'pub_date'
+    ).first()
+    if post is None:
+        return None
+    author_id, pub_date = post
+    return [f'post:{post_id}', f'author:{author_id}'], [pub_date]
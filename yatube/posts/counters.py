@@ -0,0 +1,141 @@
+from django.db.models import Count, F
+
+from .models import Comment, Follow, Post, Profile
+
+
+def actual_profile_counts(user_ids):
+    """Точные значения счётчиков для пачки пользователей."""
+    counts = {
+        user_id: dict.fromkeys(Profile.COUNTERS, 0) for user_id in user_ids
+    }
+    queries = (
+        ('posts_count', Post.objects, 'author'),
+        ('followers_count', Follow.objects, 'author'),
+        ('following_count', Follow.objects, 'user'),
+    )
+    for field, queryset, owner in queries:
+        rows = queryset.filter(
+            **{owner + '_id__in': user_ids}
+        ).order_by().values(owner).annotate(
+            count=Count('id')
+        ).values_list(owner, 'count')
+        for user_id, count in rows:
+            counts[user_id][field] = count
+    return counts
+
+
+def bump_profile(user_id, **deltas):
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    # Уменьшение не уводит счётчик ниже нуля; расхождение потом исправит
+    # reconcile_counters.
+    guards = {
+        field + '__gt': 0 for field, delta in deltas.items() if delta < 0
+    }
+    if Profile.objects.filter(user_id=user_id, **guards).update(**updates):
+        return
+    if all(delta > 0 for delta in deltas.values()):
+        # Профиля ещё нет: заводим его сразу с точными значениями.
+        Profile.objects.get_or_create(
+            user_id=user_id,
+            defaults=actual_profile_counts([user_id])[user_id]
+        )
+
+
+def post_created(post):
+    bump_profile(post.author_id, posts_count=1)
+
+
+def post_deleted(post):
+    bump_profile(post.author_id, posts_count=-1)
+
+
+def post_moved(post, old_author_id):
+    """Пост передан другому автору."""
+    bump_profile(old_author_id, posts_count=-1)
+    bump_profile(post.author_id, posts_count=1)
+
+
+def comment_created(comment):
+    if comment.post_id:
+        # Тем же UPDATE новый комментарий добавляет посту популярности;
+        # затухание применяет задача rank_popular.
+        Post.objects.filter(pk=comment.post_id).update(
+            comments_count=F('comments_count') + 1,
+            popularity=F('popularity') + 1
+        )
+
+
+def uncount_comment(post_id):
+    Post.objects.filter(pk=post_id, comments_count__gt=0).update(
+        comments_count=F('comments_count') - 1
+    )
+
+
+def comment_deleted(comment):
+    if comment.post_id:
+        uncount_comment(comment.post_id)
+
+
+def comment_moved(comment, old_post_id):
+    """Комментарий перенесён к другому посту; популярность не переносится."""
+    if old_post_id:
+        uncount_comment(old_post_id)
+    if comment.post_id:
+        Post.objects.filter(pk=comment.post_id).update(
+            comments_count=F('comments_count') + 1
+        )
+
+
+def follow_created(follow):
+    bump_profile(follow.author_id, followers_count=1)
+    bump_profile(follow.user_id, following_count=1)
+
+
+def follow_deleted(follow):
+    bump_profile(follow.author_id, followers_count=-1)
+    bump_profile(follow.user_id, following_count=-1)
+
+
+def followers_counts(author_ids):
+    counts = dict.fromkeys(author_ids, 0)
+    counts.update(
+        Profile.objects.filter(user_id__in=author_ids).values_list(
+            'user_id', 'followers_count'
+        )
+    )
+    return counts
+
+
+def reconcile_profiles(user_ids):
+    """Сверяет счётчики пачки пользователей, возвращает число исправлений."""
+    actual = actual_profile_counts(user_ids)
+    profiles = Profile.objects.filter(user_id__in=user_ids)
+    drifted = []
+    for profile in profiles:
+        counts = actual.pop(profile.user_id)
+        if any(getattr(profile, f) != v for f, v in counts.items()):
+            for field, value in counts.items():
+                setattr(profile, field, value)
+            drifted.append(profile)
+    Profile.objects.bulk_update(drifted, Profile.COUNTERS)
+    Profile.objects.bulk_create(
+        Profile(user_id=user_id, **counts)
+        for user_id, counts in actual.items()
+    )
+    return len(drifted) + len(actual)
+
+
+def reconcile_posts(post_ids):
+    actual = dict.fromkeys(post_ids, 0)
+    actual.update(
+        Comment.objects.filter(post_id__in=post_ids).order_by().values(
+            'post'
+        ).annotate(count=Count('id')).values_list('post', 'count')
+    )
+    drifted = []
+    for post in Post.objects.filter(id__in=post_ids).only('comments_count'):
+        if post.comments_count != actual[post.id]:
+            post.comments_count = actual[post.id]
+            drifted.append(post)
+    Post.objects.bulk_update(drifted, ['comments_count'])
+    return len(drifted)
@@ -0,0 +1,96 @@
+"""Потоковая выгрузка постов и комментариев в JSONL и CSV.
+
+Записи идут в формате команды import_content: сначала пользователи и
+группы, на которые ссылаются посты, затем посты и комментарии. Все
+запросы читаются через iterator(), так что память не растёт с числом
+строк.
+"""
+import csv
+import json
+
+from django.db.models import Q
+
+from .models import Comment, Group, User
+
+FIELDS = (
+    'type', 'id', 'username', 'title', 'slug', 'description',
+    'author', 'group', 'post', 'text', 'pub_date', 'image',
+)
+
+
+def records(posts, chunk_size=2000):
+    """Записи выгрузки для постов из queryset и комментариев к ним."""
+    post_ids = posts.values('id')
+    comments = Comment.objects.filter(post_id__in=post_ids)
+    users = User.objects.filter(
+        Q(id__in=posts.values('author_id'))
+        | Q(id__in=comments.values('author_id'))
+    ).order_by('id').values_list('id', 'username')
+    for pk, username in users.iterator(chunk_size=chunk_size):
+        yield {'type': 'user', 'id': pk, 'username': username}
+    groups = Group.objects.filter(
+        id__in=posts.values('group_id')
+    ).order_by('id').values_list('id', 'title', 'slug', 'description')
+    for pk, title, slug, description in groups.iterator(chunk_size=chunk_size):
+        yield {
+            'type': 'group',
+            'id': pk,
+            'title': title,
+            'slug': slug,
+            'description': description,
+        }
+    rows = posts.order_by('id').values_list(
+        'id', 'author_id', 'group_id', 'text', 'pub_date', 'image'
+    )
+    for pk, author, group, text, pub_date, image in rows.iterator(
+        chunk_size=chunk_size
+    ):
+        yield {
+            'type': 'post',
+            'id': pk,
+            'author': author,
+            'group': group,
+            'text': text,
+            'pub_date': pub_date.isoformat(),
+            'image': image,
+        }
+    rows = comments.exclude(author=None).order_by('id').values_list(
+        'id', 'post_id', 'author_id', 'text', 'pub_date'
+    )
+    for pk, post, author, text, pub_date in rows.iterator(
+        chunk_size=chunk_size
+    ):
+        yield {
+            'type': 'comment',
+            'id': pk,
+            'post': post,
+            'author': author,
+            'text': text,
+            'pub_date': pub_date.isoformat(),
+        }
+
+
+def jsonl_lines(records):
+    for record in records:
+        record = {key: value for key, value in record.items() if value}
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+class Echo:
+    """Файл для csv.writer, который возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(records):
+    writer = csv.DictWriter(Echo(), fieldnames=FIELDS)
+    yield writer.writeheader()
+    for record in records:
+        yield writer.writerow(record)
+
+
+FORMATS = {
+    'jsonl': (jsonl_lines, 'application/x-ndjson'),
+    'csv': (csv_lines, 'text/csv'),
+}
@@ -0,0 +1,61 @@
+"""Граф подписок.
+
+Множество авторов, на которых подписан пользователь, хранится в кэше
+одним ключом, так что проверка подписки на любое число авторов сразу не
+ходит в базу. Число подписчиков уже лежит в Profile.followers_count.
+Ключ сбрасывается сигналами Follow после каждой подписки и отписки.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .models import Follow
+
+FOLLOWING_KEY = 'follows:following:{}'
+
+
+def following(user_id):
+    """id авторов, на которых подписан пользователь."""
+    if not user_id:
+        return frozenset()
+    key = FOLLOWING_KEY.format(user_id)
+    authors = cache.get(key)
+    if authors is None:
+        authors = frozenset(
+            Follow.objects.filter(user_id=user_id).values_list(
+                'author_id', flat=True
+            )
+        )
+        cache.set(key, authors, settings.FOLLOWING_CACHE_TIMEOUT)
+    return authors
+
+
+def is_following(user, author_ids):
+    """Подписан ли пользователь на каждого из авторов: {id: bool}."""
+    authors = following(user.id) if user.is_authenticated else frozenset()
+    return {author_id: author_id in authors for author_id in author_ids}
+
+
+def forget(*user_ids):
+    cache.delete_many([FOLLOWING_KEY.format(pk) for pk in user_ids])
+
+
+def follow(user_id, author_id):
+    """Подписывает одним INSERT; False, если подписка уже есть."""
+    if user_id == author_id:
+        return False
+    try:
+        with transaction.atomic():
+            Follow.objects.create(user_id=user_id, author_id=author_id)
+    except IntegrityError:
+        return False
+    return True
+
+
+def unfollow(user_id, author_id):
+    """Отписывает; False, если подписки не было."""
+    deleted, _ = Follow.objects.filter(
+        user_id=user_id,
+        author_id=author_id
+    ).delete()
+    return bool(deleted)
@@ -1,6 +1,10 @@
+from django.core.files.uploadedfile import UploadedFile
+from django import forms
 from django.forms import ModelForm
 
 from .models import Comment, Post
+from .search import MIN_TERM_LENGTH
+from .uploads import process_upload
 
 
 class PostForm(ModelForm):
@@ -8,8 +12,23 @@ class PostForm(ModelForm):
         model = Post
         fields = ("text", "group", "image")
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return process_upload(image)
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
         model = Comment
         fields = ("text",)
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(
+        label='Поиск',
+        min_length=MIN_TERM_LENGTH,
+        max_length=200,
+        strip=True
+    )
@@ -0,0 +1,55 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.test import override_settings
+
+from posts.utils import FeedPaginator
+
+PER_PAGE = 10
+
+
+def render(num_pages):
+    """Пагинатор для страницы из середины ленты в num_pages страниц."""
+    paginator = FeedPaginator(range(num_pages * PER_PAGE), PER_PAGE)
+    return render_to_string(
+        'posts/includes/paginator.html',
+        {'page_obj': paginator.page(num_pages // 2 or 1)}
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет время рендеринга пагинатора ленты в зависимости от '
+        'числа страниц.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages',
+            type=int,
+            nargs='+',
+            default=[20, 1000, 50000, 1000000],
+            help='Число страниц в ленте.'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Сколько раз повторить замер; берётся лучший.'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Страниц      рендеринг, мс   пунктов')
+        # Число постов не обрезается, как в ленте с точным COUNT(*).
+        with override_settings(FEED_COUNT_LIMIT=10 ** 12):
+            for num_pages in options['pages']:
+                best = min(timeit.repeat(
+                    lambda: render(num_pages),
+                    number=1,
+                    repeat=options['repeat']
+                ))
+                items = render(num_pages).count('<li')
+                self.stdout.write(
+                    f'{num_pages:<12} {best * 1000:>13.2f} {items:>9}'
+                )
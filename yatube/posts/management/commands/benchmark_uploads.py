@@ -0,0 +1,75 @@
+import os
+import resource
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.core.files.uploadedfile import UploadedFile
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from posts.uploads import process_upload
+
+
+def make_photo(path, megapixels):
+    """JPEG 3:2 заданного размера."""
+    width = int((megapixels * 10 ** 6 * 3 / 2) ** 0.5)
+    height = width * 2 // 3
+    Image.linear_gradient('L').resize((width, height)).convert('RGB').save(
+        path, 'JPEG', quality=90
+    )
+
+
+def peak_growth(path, ingest):
+    """Прирост пикового RSS процесса в МБ за обработку одной загрузки."""
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with open(path, 'rb') as source:
+        if ingest:
+            upload = UploadedFile(
+                source,
+                os.path.basename(path),
+                'image/jpeg',
+                os.path.getsize(path)
+            )
+            process_upload(upload).close()
+        else:
+            with Image.open(source) as image:
+                image.load()
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (after - before) / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет пиковую память на одну загрузку: полное декодирование '
+        'против обработки при сохранении.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--megapixels',
+            type=int,
+            nargs='+',
+            default=[6, 12, 24, 50],
+            help='Размеры тестовых фотографий в мегапикселях.'
+        )
+
+    def run(self, function, *args):
+        """Каждый замер — в свежем процессе, чтобы пики не смешивались."""
+        with ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=get_context('fork')
+        ) as pool:
+            return pool.submit(function, *args).result()
+
+    def handle(self, *args, **options):
+        self.stdout.write('Мп      декодирование, МБ   при сохранении, МБ')
+        with tempfile.TemporaryDirectory() as directory:
+            for megapixels in options['megapixels']:
+                path = os.path.join(directory, f'{megapixels}.jpg')
+                self.run(make_photo, path, megapixels)
+                naive = self.run(peak_growth, path, False)
+                ingest = self.run(peak_growth, path, True)
+                self.stdout.write(
+                    f'{megapixels:<7} {naive:>19.1f} {ingest:>20.1f}'
+                )
@@ -0,0 +1,135 @@
+import os
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from posts import media
+from posts.models import ImageVariant, MediaFile, Post
+
+
+def walk(path):
+    """Файлы каталога и всех подкаталогов по одному, без списка."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        'Ищет в MEDIA_ROOT картинки постов и миниатюры, на которые '
+        'ничто не ссылается, и выводит или удаляет их.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='Удалить найденные файлы, а не только вывести их.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько файлов сверять с базой за один запрос.'
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=60 * 60,
+            help=(
+                'Не трогать файлы моложе стольких секунд: их пост мог '
+                'ещё не сохраниться.'
+            )
+        )
+
+    def referenced_sources(self, names):
+        """Имена из пачки, на которые ссылаются посты или их варианты."""
+        return set(
+            Post.objects.filter(image__in=names).values_list(
+                'image', flat=True
+            )
+        ) | set(
+            ImageVariant.objects.filter(file__in=names).values_list(
+                'file', flat=True
+            )
+        )
+
+    def referenced_thumbnails(self, names):
+        """Имена миниатюр из пачки, известные key-value store sorl."""
+        keys = {
+            add_prefix(ImageFile(name, default.storage).key): name
+            for name in names
+        }
+        return {
+            keys[key] for key in KVStore.objects.filter(
+                key__in=keys
+            ).values_list('key', flat=True)
+        }
+
+    def delete_source(self, name):
+        media.remove(name)
+        MediaFile.objects.filter(name=name).delete()
+
+    def delete_thumbnail(self, name):
+        default.storage.delete(name)
+
+    def candidates(self, root, cutoff):
+        for entry in walk(root):
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime < cutoff:
+                name = os.path.relpath(entry.path, settings.MEDIA_ROOT)
+                yield name.replace(os.sep, '/'), stat.st_size
+
+    def handle(self, *args, **options):
+        cutoff = time.time() - options['min_age']
+        upload_to = Post.image.field.upload_to
+        sections = (
+            (upload_to, self.referenced_sources, self.delete_source),
+            (
+                sorl_settings.THUMBNAIL_PREFIX,
+                self.referenced_thumbnails,
+                self.delete_thumbnail
+            ),
+        )
+        orphans = freed = 0
+        for prefix, referenced, delete in sections:
+            root = os.path.join(settings.MEDIA_ROOT, prefix)
+            if not os.path.isdir(root):
+                continue
+            files = self.candidates(root, cutoff)
+            for chunk in chunked(files, options['chunk_size']):
+                sizes = dict(chunk)
+                kept = referenced(list(sizes))
+                for name in sorted(set(sizes) - kept):
+                    orphans += 1
+                    freed += sizes[name]
+                    self.stdout.write(name)
+                    if options['delete']:
+                        delete(name)
+        action = 'Удалено' if options['delete'] else 'Найдено'
+        self.stdout.write(
+            f'{action} файлов без ссылок: {orphans}, '
+            f'{freed / 2 ** 20:.1f} МБ'
+        )
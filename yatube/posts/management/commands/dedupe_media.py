@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from sorl import thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from core.storage import CONTENT_NAME, content_name
+from posts import caching, media, variants
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов в хранилище по хэшу содержимого, '
+        'удаляет дубликаты и пересчитывает ссылки на файлы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько постов просматривать за один проход.'
+        )
+
+    def move(self, storage, name):
+        """Переносит файл под хэш-имя; возвращает его и признак дубликата."""
+        with storage.open(name) as source:
+            new_name = content_name(name, source)
+            duplicate = storage.exists(new_name)
+            if not duplicate:
+                new_name = storage.save(name, source)
+        posts = Post.objects.filter(image=name)
+        for post in posts.values_list('id', 'author_id', 'group_id'):
+            caching.bump(*caching.post_scopes(*post))
+        posts.update(image=new_name)
+        variants.delete(name)
+        thumbnail.delete(ImageFile(name, storage))
+        return new_name, duplicate
+
+    def handle(self, *args, **options):
+        storage = Post.image.field.storage
+        moved = duplicates = missing = 0
+        last_id = 0
+        while True:
+            rows = list(
+                Post.objects.filter(id__gt=last_id).exclude(
+                    image=''
+                ).order_by('id').values_list('id', 'image')[
+                    :options['chunk_size']
+                ]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            names = {
+                name for _, name in rows if not CONTENT_NAME.search(name)
+            }
+            for name in sorted(names):
+                if not storage.exists(name):
+                    missing += 1
+                    continue
+                _, duplicate = self.move(storage, name)
+                if duplicate:
+                    duplicates += 1
+                else:
+                    moved += 1
+        media.reconcile()
+        self.stdout.write(
+            f'Перенесено файлов: {moved}, '
+            f'удалено дубликатов: {duplicates}, '
+            f'не найдено: {missing}'
+        )
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+
+from posts import export
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты и комментарии в JSONL или CSV потоком, в формате '
+        'команды import_content.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--author',
+            help='Выгрузить только посты этого пользователя.'
+        )
+        parser.add_argument(
+            '--group',
+            help='Выгрузить только посты группы с этим slug.'
+        )
+        parser.add_argument(
+            '--format',
+            choices=tuple(export.FORMATS),
+            default='jsonl'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Сколько строк читать из базы за раз.'
+        )
+        parser.add_argument(
+            '-o', '--output',
+            help='Файл для выгрузки; по умолчанию — stdout.'
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        if options['author']:
+            posts = posts.filter(author__username=options['author'])
+        if options['group']:
+            posts = posts.filter(group__slug=options['group'])
+        lines, _ = export.FORMATS[options['format']]
+        records = export.records(posts, chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(
+                options['output'], 'w', encoding='utf-8', newline=''
+            ) as stream:
+                stream.writelines(lines(records))
+            return
+        for line in lines(records):
+            self.stdout.write(line, ending='')
@@ -0,0 +1,317 @@
+import csv
+import json
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.text import capfirst
+
+from posts import caching, counters, follows, media, timeline
+from posts.models import Comment, Follow, Group, Post, User
+
+# Порядок записи: сначала то, на что ссылаются остальные.
+MODELS = (User, Group, Post, Comment, Follow)
+TYPES = {
+    'user': User,
+    'group': Group,
+    'post': Post,
+    'comment': Comment,
+    'follow': Follow,
+}
+
+
+def read_jsonl(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(stream):
+    for row in csv.DictReader(stream):
+        yield {key: value for key, value in row.items() if value != ''}
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+@contextmanager
+def original_dates(*models):
+    """Отключает auto_now_add, чтобы сохранить даты из источника."""
+    fields = [model._meta.get_field('pub_date') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+@contextmanager
+def deferred_indexes(*models):
+    """Снимает индексы на время загрузки и строит их заново в конце."""
+    indexes = [
+        (model, index) for model in models for index in model._meta.indexes
+    ]
+    with connection.schema_editor() as editor:
+        for model, index in indexes:
+            editor.remove_index(model, index)
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.add_index(model, index)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает пользователей, группы, посты, комментарии и подписки '
+        'из JSONL или CSV пачками bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Файл с записями; «-» — читать из stdin.'
+        )
+        parser.add_argument(
+            '--format',
+            choices=('jsonl', 'csv'),
+            help='Формат записей; по умолчанию — по расширению файла.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько записей сохранять в одной транзакции.'
+        )
+        parser.add_argument(
+            '--defer-indexes',
+            action='store_true',
+            help='Снять индексы постов и комментариев на время загрузки.'
+        )
+
+    # Разбор записей
+
+    def parse_date(self, value):
+        if not value:
+            return timezone.now()
+        date = parse_datetime(value)
+        if date is None:
+            raise ValueError(f'Неверная дата: {value}')
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date)
+        return date
+
+    def next_id(self, model):
+        self.last_ids[model] += 1
+        return self.last_ids[model]
+
+    def resolve(self, model, key):
+        """Первичный ключ по внешнему id; KeyError, если его не было."""
+        return self.ids[model][str(key)]
+
+    def build_user(self, row):
+        username = row['username']
+        if username in self.usernames:
+            self.ids[User][str(row['id'])] = self.usernames[username]
+            return None
+        user = User(
+            id=self.next_id(User),
+            username=username,
+            password=make_password(None),
+            date_joined=self.parse_date(row.get('date_joined'))
+        )
+        self.usernames[username] = user.id
+        self.ids[User][str(row['id'])] = user.id
+        self.touched['users'].add(user.id)
+        return user
+
+    def build_group(self, row):
+        slug = row['slug']
+        if slug in self.slugs:
+            self.ids[Group][str(row['id'])] = self.slugs[slug]
+            return None
+        group = Group(
+            id=self.next_id(Group),
+            title=row['title'],
+            slug=slug,
+            description=row.get('description', '')
+        )
+        self.slugs[slug] = group.id
+        self.ids[Group][str(row['id'])] = group.id
+        return group
+
+    def build_post(self, row):
+        group = row.get('group')
+        post = Post(
+            id=self.next_id(Post),
+            text=row['text'],
+            author_id=self.resolve(User, row['author']),
+            group_id=self.resolve(Group, group) if group else None,
+            image=row.get('image', ''),
+            pub_date=self.parse_date(row.get('pub_date'))
+        )
+        self.ids[Post][str(row['id'])] = post.id
+        self.touched['users'].add(post.author_id)
+        self.touched['authors'].add(post.author_id)
+        if post.group_id:
+            self.touched['groups'].add(post.group_id)
+        if post.image:
+            self.touched['media'] = True
+        return post
+
+    def build_comment(self, row):
+        comment = Comment(
+            id=self.next_id(Comment),
+            text=row['text'],
+            post_id=self.resolve(Post, row['post']),
+            author_id=self.resolve(User, row['author']),
+            pub_date=self.parse_date(row.get('pub_date'))
+        )
+        self.touched['posts'].add(comment.post_id)
+        return comment
+
+    def build_follow(self, row):
+        user_id = self.resolve(User, row['user'])
+        author_id = self.resolve(User, row['author'])
+        if user_id == author_id:
+            return None
+        self.touched['users'].update((user_id, author_id))
+        self.touched['authors'].add(author_id)
+        return Follow(user_id=user_id, author_id=author_id)
+
+    # Запись в базу
+
+    def flush(self, buffers):
+        with transaction.atomic():
+            for model in MODELS:
+                if buffers[model]:
+                    # Размер пачки INSERT подбирает сам бэкенд базы.
+                    model.objects.bulk_create(
+                        buffers[model],
+                        ignore_conflicts=model is Follow
+                    )
+                    self.created[model] += len(buffers[model])
+                    buffers[model] = []
+
+    def reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(no_style(), MODELS)
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def rebuild(self):
+        """Счётчики, ленты подписок и кэши, отложенные до конца загрузки."""
+        users = sorted(self.touched['users'])
+        for chunk in chunked(users, self.batch_size):
+            counters.reconcile_profiles(chunk)
+        for chunk in chunked(sorted(self.touched['posts']), self.batch_size):
+            counters.reconcile_posts(chunk)
+        follows.forget(*users)
+        authors = sorted(self.touched['authors'])
+        for chunk in chunked(authors, self.batch_size):
+            timeline.rebalance(chunk)
+            live = timeline.pulled(chunk)
+            edges = Follow.objects.filter(author_id__in=[
+                author_id for author_id in chunk if author_id not in live
+            ]).values_list('user_id', 'author_id')
+            for user_id, author_id in edges.iterator():
+                timeline.backfill(user_id, author_id)
+        if self.touched['media']:
+            media.reconcile()
+        caching.bump(
+            'index',
+            *(f'group:{pk}' for pk in self.touched['groups']),
+            *(f'author:{pk}' for pk in authors),
+            *(f'profile:{pk}' for pk in users),
+            *(f'post:{pk}' for pk in self.touched['posts'])
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format_ = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl'
+        )
+        reader = read_csv if format_ == 'csv' else read_jsonl
+        self.batch_size = options['batch_size']
+        self.ids = {model: {} for model in MODELS}
+        self.last_ids = Counter({
+            model: model.objects.aggregate(last=Max('id'))['last'] or 0
+            for model in MODELS
+        })
+        self.usernames = dict(User.objects.values_list('username', 'id'))
+        self.slugs = dict(Group.objects.values_list('slug', 'id'))
+        self.touched = {
+            'users': set(),
+            'authors': set(),
+            'groups': set(),
+            'posts': set(),
+            'media': False,
+        }
+        self.created = Counter()
+        builders = {
+            User: self.build_user,
+            Group: self.build_group,
+            Post: self.build_post,
+            Comment: self.build_comment,
+            Follow: self.build_follow,
+        }
+        buffers = {model: [] for model in MODELS}
+        buffered = skipped = 0
+        started = time.monotonic()
+        stream = sys.stdin if path == '-' else open(
+            path, encoding='utf-8', newline=''
+        )
+        indexes = deferred_indexes(Post, Comment) if options[
+            'defer_indexes'
+        ] else nullcontext()
+        with stream, original_dates(Post, Comment), indexes:
+            for number, row in enumerate(reader(stream), 1):
+                model = TYPES.get(row.get('type'))
+                if model is None:
+                    raise CommandError(
+                        f'Строка {number}: неизвестный тип {row.get("type")}'
+                    )
+                try:
+                    obj = builders[model](row)
+                except (KeyError, ValueError) as error:
+                    skipped += 1
+                    self.stderr.write(f'Строка {number} пропущена: {error!r}')
+                    continue
+                if obj is not None:
+                    buffers[model].append(obj)
+                    buffered += 1
+                if buffered >= self.batch_size:
+                    self.flush(buffers)
+                    buffered = 0
+            self.flush(buffers)
+        self.reset_sequences()
+        self.rebuild()
+        elapsed = time.monotonic() - started
+        total = sum(self.created.values())
+        for model in MODELS:
+            self.stdout.write(
+                f'{capfirst(model._meta.verbose_name_plural)}: '
+                f'{self.created[model]}'
+            )
+        self.stdout.write(
+            f'Загружено записей: {total}, пропущено: {skipped}, '
+            f'{elapsed:.1f} с, {total / max(elapsed, 1e-9):.0f} записей/с'
+        )
@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import popular
+
+
+class Command(BaseCommand):
+    help = (
+        'Применяет затухание к оценкам популярности и сохраняет ленту '
+        'популярных постов. Запускать периодически, например из cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help=(
+                'Пересчитать оценки по комментариям с нуля, например '
+                'после импорта или первого развёртывания.'
+            )
+        )
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=settings.POPULAR_SIZE,
+            help='Сколько постов сохранить в ленте.'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['rebuild']:
+            scored = popular.rebuild()
+            self.stdout.write(f'Пересчитано постов: {scored}')
+        else:
+            popular.decay_since_last_run()
+        ranked = popular.materialize(options['size'])
+        self.stdout.write(
+            f'Постов в ленте популярного: {ranked}, '
+            f'{time.monotonic() - started:.1f} с'
+        )
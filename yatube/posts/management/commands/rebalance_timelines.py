@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from posts import timeline
+from posts.models import Profile
+
+
+class Command(BaseCommand):
+    help = (
+        'Возвращает рассылку по лентам авторам, у которых стало мало '
+        'подписчиков, и дозаполняет ленты. Запускается периодически.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько авторов обрабатывать за один проход.'
+        )
+
+    def handle(self, *args, **options):
+        authors = Profile.objects.filter(
+            Q(timeline_pulled=True)
+            | Q(followers_count__gt=settings.TIMELINE_FANOUT_LIMIT)
+        )
+        resumed = 0
+        last_id = 0
+        while True:
+            ids = list(
+                authors.filter(user_id__gt=last_id).order_by(
+                    'user_id'
+                ).values_list('user_id', flat=True)[:options['chunk_size']]
+            )
+            if not ids:
+                break
+            resumed += timeline.rebalance(ids)
+            last_id = ids[-1]
+        self.stdout.write(f'Рассылка возвращена авторам: {resumed}')
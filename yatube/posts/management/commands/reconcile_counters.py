@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile_posts, reconcile_profiles
+from posts.models import Post, User
+
+
+class Command(BaseCommand):
+    help = 'Сверяет денормализованные счётчики с таблицами пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько строк сверять за один проход.'
+        )
+
+    def chunks(self, queryset, size):
+        """Идёт по первичному ключу без OFFSET."""
+        last_id = 0
+        while True:
+            ids = list(
+                queryset.filter(id__gt=last_id).order_by('id').values_list(
+                    'id', flat=True
+                )[:size]
+            )
+            if not ids:
+                return
+            yield ids
+            last_id = ids[-1]
+
+    def handle(self, *args, **options):
+        size = options['chunk_size']
+        fixed_profiles = sum(
+            reconcile_profiles(ids)
+            for ids in self.chunks(User.objects.all(), size)
+        )
+        fixed_posts = sum(
+            reconcile_posts(ids)
+            for ids in self.chunks(Post.objects.all(), size)
+        )
+        self.stdout.write(
+            f'Исправлено профилей: {fixed_profiles}, '
+            f'постов: {fixed_posts}'
+        )
@@ -0,0 +1,55 @@
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import suggestions
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации авторов по общим подпискам и '
+        'сохраняет их в таблицу рекомендаций.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=settings.SUGGESTIONS_LIMIT,
+            help='Сколько рекомендаций хранить для пользователя.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Для скольких пользователей записывать за одну транзакцию.'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        graph = suggestions.FollowGraph.load()
+        loaded = time.monotonic()
+        stored = 0
+        for user_ids in chunked(graph.rows, options['chunk_size']):
+            stored += suggestions.store(graph, user_ids, options['limit'])
+        pruned = suggestions.prune()
+        finished = time.monotonic()
+        self.stdout.write(
+            f'Подписок: {len(graph.indices)}, пользователей: {len(graph)}, '
+            f'граф загружен за {loaded - started:.1f} с'
+        )
+        self.stdout.write(
+            f'Записано рекомендаций: {stored}, удалено устаревших: {pruned}, '
+            f'{finished - started:.1f} с'
+        )
@@ -0,0 +1,67 @@
+"""Счётчики ссылок постов на файлы картинок.
+
+Одинаковые картинки хранятся одним файлом, поэтому удалять его можно
+только вместе с последним постом, который на него ссылается.
+"""
+import logging
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from sorl import thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from . import variants
+from .models import MediaFile, Post
+
+logger = logging.getLogger(__name__)
+
+
+def acquire(name):
+    if not name:
+        return
+    if MediaFile.objects.filter(name=name).update(
+        references=F('references') + 1
+    ):
+        return
+    try:
+        with transaction.atomic():
+            MediaFile.objects.create(name=name, references=1)
+    except IntegrityError:
+        # Запись успели создать параллельно.
+        MediaFile.objects.filter(name=name).update(
+            references=F('references') + 1
+        )
+
+
+def release(name):
+    if not name:
+        return
+    MediaFile.objects.filter(name=name, references__gt=0).update(
+        references=F('references') - 1
+    )
+    deleted, _ = MediaFile.objects.filter(name=name, references=0).delete()
+    if deleted:
+        transaction.on_commit(lambda: remove(name))
+
+
+def remove(name):
+    """Удаляет файл вместе с его миниатюрами и вариантами."""
+    try:
+        variants.delete(name)
+        thumbnail.delete(ImageFile(name, Post.image.field.storage))
+    except SuspiciousFileOperation:
+        logger.warning('Файл %s лежит вне хранилища, не удаляем', name)
+
+
+def reconcile():
+    """Пересчитывает ссылки на файлы по таблице постов."""
+    rows = Post.objects.exclude(image='').order_by().values(
+        'image'
+    ).annotate(count=Count('id')).values_list('image', 'count')
+    with transaction.atomic():
+        MediaFile.objects.all().delete()
+        MediaFile.objects.bulk_create(
+            [MediaFile(name=name, references=count) for name, count in rows],
+            batch_size=500
+        )
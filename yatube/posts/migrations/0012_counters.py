@@ -0,0 +1,87 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:17
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+CHUNK_SIZE = 500
+
+
+def chunks(queryset):
+    ids = list(queryset.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def grouped_counts(queryset, field, ids):
+    """Число строк queryset на каждый id из ids одним GROUP BY."""
+    return dict(
+        queryset.filter(**{field + '__in': ids}).order_by().values(
+            field
+        ).annotate(count=Count('id')).values_list(field, 'count')
+    )
+
+
+def fill_counters(apps, schema_editor):
+    # Отдельный GROUP BY на каждый счётчик: Count по нескольким
+    # связям сразу перемножил бы строки join.
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    Profile = apps.get_model('posts', 'Profile')
+    for user_ids in chunks(User.objects):
+        posts = grouped_counts(Post.objects, 'author_id', user_ids)
+        followers = grouped_counts(Follow.objects, 'author_id', user_ids)
+        following = grouped_counts(Follow.objects, 'user_id', user_ids)
+        Profile.objects.bulk_create(
+            Profile(
+                user_id=user_id,
+                posts_count=posts.get(user_id, 0),
+                followers_count=followers.get(user_id, 0),
+                following_count=following.get(user_id, 0),
+            )
+            for user_id in user_ids
+        )
+    for post_ids in chunks(Post.objects):
+        comments = grouped_counts(Comment.objects, 'post_id', post_ids)
+        Post.objects.bulk_update(
+            [
+                Post(id=post_id, comments_count=count)
+                for post_id, count in comments.items()
+            ],
+            ['comments_count']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0011_timeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число комментариев'),
+        ),
+        migrations.CreateModel(
+            name='Profile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Число подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Число подписок')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Профиль',
+                'verbose_name_plural': 'Профили',
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageVariant',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=100, verbose_name='Исходная картинка')),
+                ('width', models.PositiveIntegerField(verbose_name='Ширина')),
+                ('mime_type', models.CharField(max_length=20, verbose_name='Тип')),
+                ('file', models.FileField(max_length=255, upload_to='', verbose_name='Файл')),
+            ],
+            options={
+                'verbose_name': 'Вариант картинки',
+                'verbose_name_plural': 'Варианты картинок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='imagevariant',
+            constraint=models.UniqueConstraint(fields=('source', 'width', 'mime_type'), name='one_image_variant'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+from django.db import migrations
+
+# Индекс FTS5 с внешним содержимым: текст хранится только в posts_post,
+# а триггеры держат индекс в актуальном состоянии при любой записи,
+# включая bulk_create и update().
+CREATE = (
+    """
+    CREATE VIRTUAL TABLE posts_post_search USING fts5(
+        text,
+        content='posts_post',
+        content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER posts_post_search_insert AFTER INSERT ON posts_post
+    BEGIN
+        INSERT INTO posts_post_search(rowid, text)
+        VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_post_search_delete AFTER DELETE ON posts_post
+    BEGIN
+        INSERT INTO posts_post_search(posts_post_search, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_post_search_update AFTER UPDATE OF text
+    ON posts_post
+    BEGIN
+        INSERT INTO posts_post_search(posts_post_search, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO posts_post_search(rowid, text)
+        VALUES (new.id, new.text);
+    END
+    """,
+    "INSERT INTO posts_post_search(posts_post_search) VALUES ('rebuild')",
+)
+DROP = (
+    'DROP TRIGGER IF EXISTS posts_post_search_update',
+    'DROP TRIGGER IF EXISTS posts_post_search_delete',
+    'DROP TRIGGER IF EXISTS posts_post_search_insert',
+    'DROP TABLE IF EXISTS posts_post_search',
+)
+
+
+def run(statements):
+    def execute(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return execute
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_suggestions'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE), run(DROP)),
+    ]
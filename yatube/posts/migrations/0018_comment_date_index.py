@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['pub_date'], name='comment_date_idx'),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# AddField и RemoveField пересобирают posts_post на SQLite, и триггеры
+# поиска из 0017 пропадают вместе со старой таблицей.
+TRIGGERS = (
+    'DROP TRIGGER IF EXISTS posts_post_search_update',
+    'DROP TRIGGER IF EXISTS posts_post_search_delete',
+    'DROP TRIGGER IF EXISTS posts_post_search_insert',
+    """
+    CREATE TRIGGER posts_post_search_insert AFTER INSERT ON posts_post
+    BEGIN
+        INSERT INTO posts_post_search(rowid, text)
+        VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_post_search_delete AFTER DELETE ON posts_post
+    BEGIN
+        INSERT INTO posts_post_search(posts_post_search, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_post_search_update AFTER UPDATE OF text
+    ON posts_post
+    BEGIN
+        INSERT INTO posts_post_search(posts_post_search, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO posts_post_search(rowid, text)
+        VALUES (new.id, new.text);
+    END
+    """,
+    "INSERT INTO posts_post_search(posts_post_search) VALUES ('rebuild')",
+)
+
+
+def install_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in TRIGGERS:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_comment_date_index'),
+    ]
+
+    operations = [
+        # При откате: после удаления поля таблица снова пересобрана.
+        migrations.RunPython(
+            migrations.RunPython.noop,
+            install_search_triggers
+        ),
+        migrations.CreateModel(
+            name='PopularPost',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField(unique=True, verbose_name='Место')),
+                ('score', models.FloatField(verbose_name='Популярность')),
+            ],
+            options={
+                'verbose_name': 'Популярный пост',
+                'verbose_name_plural': 'Популярные посты',
+                'ordering': ('rank',),
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='popularity',
+            field=models.FloatField(default=0, editable=False, help_text='Комментарии с экспоненциальным затуханием по времени', verbose_name='Популярность'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-popularity'], name='post_popularity_idx'),
+        ),
+        migrations.AddField(
+            model_name='popularpost',
+            name='post',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post', verbose_name='Пост'),
+        ),
+        migrations.RunPython(
+            install_search_triggers,
+            migrations.RunPython.noop
+        ),
+    ]
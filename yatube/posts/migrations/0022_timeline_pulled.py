@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_pulled(apps, schema_editor):
+    """Раньше авторов читали на лету по числу подписчиков."""
+    Profile = apps.get_model('posts', 'Profile')
+    Profile.objects.filter(
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).update(timeline_pulled=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_timeline_cursor_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='timeline_pulled',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Посты читаются на лету'),
+        ),
+        migrations.RunPython(mark_pulled, migrations.RunPython.noop),
+    ]
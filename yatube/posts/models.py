@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth import get_user_model
 
 from core.models import CreatedModel
+from core.storage import ContentAddressedStorage
 
 User = get_user_model()
 
@@ -23,6 +24,56 @@ class Group(models.Model):
         return self.title
 
 
+class Profile(models.Model):
+    """Денормализованные счётчики пользователя."""
+    COUNTERS = ('posts_count', 'followers_count', 'following_count')
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='profile',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        'Число подписок',
+        default=0
+    )
+    timeline_pulled = models.BooleanField(
+        'Посты читаются на лету',
+        default=False,
+        editable=False
+    )
+
+    class Meta:
+        verbose_name = 'Профиль'
+        verbose_name_plural = 'Профили'
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Всё, что нужно карточке поста, за один запрос."""
+        return self.select_related('author', 'group').only(
+            'id',
+            'text',
+            'pub_date',
+            'image',
+            'author',
+            'author__username',
+            'group',
+            'group__title',
+            'group__slug',
+            'comments_count',
+        )
+
+
 class Post(CreatedModel):
     text = models.TextField(
         verbose_name='Текст',
@@ -46,13 +97,43 @@ class Post(CreatedModel):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
+    popularity = models.FloatField(
+        'Популярность',
+        default=0,
+        editable=False,
+        help_text='Комментарии с экспоненциальным затуханием по времени'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date', )
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            # id в конце — порядок курсора (pub_date, id) без сортировки.
+            models.Index(fields=['-pub_date', '-id'], name='post_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_date_idx'
+            ),
+            models.Index(
+                fields=['-popularity', '-id'],
+                name='post_popularity_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -80,8 +161,16 @@ class Comment(CreatedModel):
     )
 
     class Meta:
+        ordering = ('pub_date', )
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', 'pub_date'],
+                name='comment_post_date_idx'
+            ),
+            models.Index(fields=['pub_date'], name='comment_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -115,3 +204,123 @@ class Follow(models.Model):
                 name='prevent_self_follow'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            ),
+        ]
+
+
+class Timeline(models.Model):
+    """Материализованная лента подписок: запись на каждого подписчика."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField('Дата создания поста')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='one_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_date_idx'
+            ),
+        ]
+
+
+class ImageVariant(models.Model):
+    """Копия картинки поста определённой ширины и формата."""
+    source = models.CharField('Исходная картинка', max_length=100)
+    width = models.PositiveIntegerField('Ширина')
+    mime_type = models.CharField('Тип', max_length=20)
+    file = models.FileField('Файл', max_length=255)
+
+    class Meta:
+        verbose_name = 'Вариант картинки'
+        verbose_name_plural = 'Варианты картинок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'width', 'mime_type'],
+                name='one_image_variant'
+            ),
+        ]
+
+
+class MediaFile(models.Model):
+    """Число постов, ссылающихся на файл в хранилище."""
+    name = models.CharField('Файл', max_length=100, unique=True)
+    references = models.PositiveIntegerField('Число ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+
+    def __str__(self):
+        return self.name
+
+
+class Suggestion(models.Model):
+    """Автор, на которого подписаны авторы из подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='suggestions',
+        verbose_name='Пользователь'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    score = models.PositiveIntegerField('Общих подписок')
+
+    class Meta:
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='one_suggestion'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-score'],
+                name='suggestion_user_score_idx'
+            ),
+        ]
+
+
+class PopularPost(models.Model):
+    """Место поста в последнем расчёте ленты популярного."""
+    rank = models.PositiveIntegerField('Место', unique=True)
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пост'
+    )
+    score = models.FloatField('Популярность')
+
+    class Meta:
+        ordering = ('rank',)
+        verbose_name = 'Популярный пост'
+        verbose_name_plural = 'Популярные посты'
@@ -0,0 +1,123 @@
+"""Лента популярных постов.
+
+Каждый новый комментарий прибавляет посту единицу к Post.popularity в
+том же UPDATE, что и счётчик комментариев. Задача rank_popular
+периодически умножает все ненулевые оценки на
+2 ** (-прошедшее время / POPULAR_HALF_LIFE): вклад комментария
+затухает экспоненциально. Затем первые POPULAR_SIZE постов
+сохраняются в таблицу PopularPost и списком id в кэш. Страница ленты —
+срез этого списка и один запрос за постами, без агрегации по
+комментариям.
+"""
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import caching
+from .models import Comment, PopularPost, Post
+from .utils import FeedPaginator
+
+IDS_KEY = 'popular:ids'
+DECAYED_KEY = 'popular:decayed_at'
+SCOPE = 'popular'
+
+
+def decay_factor(elapsed):
+    return 2 ** (-elapsed / settings.POPULAR_HALF_LIFE)
+
+
+def decay(elapsed):
+    """Затухание оценок за elapsed секунд; совсем малые обнуляются."""
+    factor = decay_factor(elapsed)
+    Post.objects.filter(popularity__gt=0).update(
+        popularity=F('popularity') * factor
+    )
+    Post.objects.filter(
+        popularity__gt=0,
+        popularity__lt=settings.POPULAR_MIN_SCORE
+    ).update(popularity=0)
+
+
+def decay_since_last_run():
+    """Затухание с прошлого запуска; при первом запуске только отметка.
+
+    Время запуска хранится в кэше: если ключ вытеснен, один интервал
+    затухания пропускается, а не применяется дважды.
+    """
+    now = time.time()
+    last = cache.get(DECAYED_KEY)
+    if last is not None and now > last:
+        decay(now - last)
+    cache.set(DECAYED_KEY, now, None)
+
+
+def rebuild(now=None):
+    """Пересчитывает оценки по комментариям, которые ещё не затухли."""
+    now = now or timezone.now()
+    half_lives = settings.POPULAR_REBUILD_HALF_LIVES
+    window = timedelta(seconds=settings.POPULAR_HALF_LIFE * half_lives)
+    scores = defaultdict(float)
+    comments = Comment.objects.filter(
+        post__isnull=False,
+        pub_date__gte=now - window
+    ).values_list('post_id', 'pub_date')
+    for post_id, pub_date in comments.iterator(chunk_size=2000):
+        scores[post_id] += decay_factor((now - pub_date).total_seconds())
+    with transaction.atomic():
+        Post.objects.filter(popularity__gt=0).update(popularity=0)
+        Post.objects.bulk_update(
+            [
+                Post(id=post_id, popularity=score)
+                for post_id, score in scores.items()
+                if score >= settings.POPULAR_MIN_SCORE
+            ],
+            ['popularity'],
+            batch_size=500
+        )
+    cache.set(DECAYED_KEY, now.timestamp(), None)
+    return len(scores)
+
+
+def materialize(size=None):
+    """Сохраняет первые size постов по оценке; возвращает их число."""
+    size = size or settings.POPULAR_SIZE
+    rows = list(
+        Post.objects.filter(popularity__gt=0).order_by(
+            '-popularity', '-id'
+        ).values_list('id', 'popularity')[:size]
+    )
+    with transaction.atomic():
+        PopularPost.objects.all().delete()
+        PopularPost.objects.bulk_create(
+            PopularPost(rank=rank, post_id=post_id, score=score)
+            for rank, (post_id, score) in enumerate(rows, 1)
+        )
+    cache.set(IDS_KEY, [post_id for post_id, _ in rows], None)
+    caching.bump(SCOPE)
+    return len(rows)
+
+
+def ranked_ids():
+    ids = cache.get(IDS_KEY)
+    if ids is None:
+        ids = list(PopularPost.objects.values_list('post_id', flat=True))
+        cache.set(IDS_KEY, ids, None)
+    return ids
+
+
+def page(request):
+    """Страница ленты: срез готового списка id и посты к нему."""
+    paginator = FeedPaginator(ranked_ids(), settings.PAGE_SIZE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    posts = Post.objects.for_feed().in_bulk(page_obj.object_list)
+    page_obj.object_list = [
+        posts[post_id] for post_id in page_obj.object_list
+        if post_id in posts
+    ]
+    return page_obj
@@ -0,0 +1,134 @@
+"""Полнотекстовый поиск по постам.
+
+На SQLite посты индексирует таблица FTS5 posts_post_search с
+токенизатором trigram: он ищет любую подстроку от трёх символов без
+учёта регистра, в том числе в кириллице. Индекс ведут триггеры на
+posts_post из миграции 0017; миграция, которая на SQLite пересобирает
+posts_post, теряет их вместе со старой таблицей и должна создать их
+заново своей копией SQL. Выдача упорядочена по bm25 и листается
+курсором (rank, id). На других базах поиск падает обратно на
+icontains.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+from .utils import CursorPage
+
+TABLE = 'posts_post_search'
+# Короче трёх символов trigram-индекс ничего не найдёт.
+MIN_TERM_LENGTH = 3
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Запрос MATCH: все слова запроса как фразы; None — искать нечего."""
+    terms = [
+        '"{}"'.format(term.replace('"', '""'))
+        for term in query.split() if len(term) >= MIN_TERM_LENGTH
+    ]
+    return ' '.join(terms) or None
+
+
+class Subquery(RawSQL):
+    """RawSQL для фильтра __in: скобки вокруг подзапроса ставит сам IN.
+
+    Со скобками RawSQL получилось бы IN ((SELECT ...)), и SQLite
+    сравнивал бы id только с первой строкой подзапроса.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def matching_ids(expression):
+    """Подзапрос с id постов, подходящих под выражение MATCH."""
+    return Subquery(
+        f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s',
+        [expression]
+    )
+
+
+def encode_cursor(rank, pk):
+    raw = json.dumps([rank, pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает пару (rank, id) или None для битого токена."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        rank, pk = json.loads(raw.decode())
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if not isinstance(rank, (int, float)) or not isinstance(pk, int):
+        return None
+    return rank, pk
+
+
+def ranked_ids(expression, after=None, limit=None):
+    """Пары (id, rank) совпадений, лучшие первыми, за курсором after.
+
+    Ранг читается из той же строки FTS, что и MATCH: bm25 считается один
+    раз на совпадение, а не подзапросом на каждый пост.
+    """
+    sql = f'SELECT rowid, rank FROM {TABLE} WHERE {TABLE} MATCH %s'
+    params = [expression]
+    if after is not None:
+        rank, pk = after
+        sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+        params += [rank, rank, pk]
+    sql += ' ORDER BY rank, rowid'
+    if limit is not None:
+        sql += ' LIMIT %s'
+        params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def with_posts(rows):
+    """Посты для ленты в порядке rows, с рангом в атрибуте rank."""
+    posts = Post.objects.for_feed().in_bulk([pk for pk, _ in rows])
+    found = []
+    for pk, rank in rows:
+        if pk in posts:
+            posts[pk].rank = rank
+            found.append(posts[pk])
+    return found
+
+
+def ranked(query):
+    """Все найденные посты с рангом bm25; лучшие совпадения первыми."""
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    return with_posts(ranked_ids(expression))
+
+
+def page(query, after=None, per_page=None):
+    """Страница результатов поиска за курсором after."""
+    per_page = per_page or settings.PAGE_SIZE
+    expression = match_expression(query)
+    if expression is None:
+        return CursorPage([], None, None, None)
+    if not is_available():
+        rows = Post.objects.for_feed().filter(text__icontains=query)
+        rows = list(rows.order_by('-pub_date', '-id')[:per_page])
+        return CursorPage(rows, None, None, None)
+    cursor = decode_cursor(after) if after else None
+    rows = ranked_ids(expression, cursor, per_page + 1)
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        pk, rank = rows[-1]
+        next_cursor = encode_cursor(rank, pk)
+    return CursorPage(with_posts(rows), None, next_cursor, None)
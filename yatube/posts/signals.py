@@ -0,0 +1,170 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import caching, counters, follows, media, timeline
+from .models import Comment, Follow, Post, Profile, User
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        Profile.objects.get_or_create(user=instance)
+
+
+def bump_comment_scopes(post_id):
+    post = Post.objects.filter(pk=post_id).values_list(
+        'id', 'author_id', 'group_id'
+    ).first()
+    if post:
+        caching.bump(*caching.comment_scopes(*post))
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    instance.saved_group_id = None
+    instance.saved_author_id = None
+    instance.saved_image = ''
+    if instance.pk:
+        saved = Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'author_id', 'image'
+        ).first()
+        if saved:
+            (
+                instance.saved_group_id,
+                instance.saved_author_id,
+                instance.saved_image,
+            ) = saved
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    scopes = caching.post_scopes(
+        instance.id,
+        instance.author_id,
+        instance.group_id
+    )
+    if instance.saved_group_id:
+        scopes.append(f'group:{instance.saved_group_id}')
+    moved = (
+        instance.saved_author_id
+        and instance.saved_author_id != instance.author_id
+    )
+    if moved:
+        scopes.append(f'author:{instance.saved_author_id}')
+        counters.post_moved(instance, instance.saved_author_id)
+    caching.bump(*scopes)
+    if created:
+        caching.bump_counts(*caching.feed_scopes(
+            instance.author_id,
+            instance.group_id
+        ))
+    else:
+        feeds = set()
+        if instance.saved_group_id != instance.group_id:
+            feeds.update(
+                f'group:{group_id}'
+                for group_id in (instance.saved_group_id, instance.group_id)
+                if group_id
+            )
+        if moved:
+            feeds.update((
+                f'author:{instance.saved_author_id}',
+                f'author:{instance.author_id}',
+            ))
+        if feeds:
+            caching.bump_counts(*feeds)
+    if instance.image.name != instance.saved_image:
+        media.acquire(instance.image.name)
+        media.release(instance.saved_image)
+    if created:
+        counters.post_created(instance)
+        timeline.fan_out(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    caching.bump(*caching.post_scopes(
+        instance.id,
+        instance.author_id,
+        instance.group_id
+    ))
+    caching.bump_counts(*caching.feed_scopes(
+        instance.author_id,
+        instance.group_id
+    ))
+    counters.post_deleted(instance)
+    media.release(instance.image.name)
+
+
+@receiver(pre_save, sender=Comment)
+def comment_saving(sender, instance, **kwargs):
+    instance.saved_post_id = None
+    if instance.pk:
+        instance.saved_post_id = Comment.objects.filter(
+            pk=instance.pk
+        ).values_list('post_id', flat=True).first()
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.comment_created(instance)
+        bump_comment_scopes(instance.post_id)
+    elif instance.saved_post_id != instance.post_id:
+        counters.comment_moved(instance, instance.saved_post_id)
+        bump_comment_scopes(instance.saved_post_id)
+        bump_comment_scopes(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.comment_deleted(instance)
+    bump_comment_scopes(instance.post_id)
+
+
+def started_following(follow):
+    follows.forget(follow.user_id)
+    counters.follow_created(follow)
+    caching.bump(
+        f'profile:{follow.author_id}',
+        f'profile:{follow.user_id}'
+    )
+    timeline.followed(follow.user_id, follow.author_id)
+
+
+def stopped_following(follow):
+    follows.forget(follow.user_id)
+    counters.follow_deleted(follow)
+    caching.bump(
+        f'profile:{follow.author_id}',
+        f'profile:{follow.user_id}'
+    )
+    timeline.unfollowed(follow.user_id, follow.author_id)
+
+
+@receiver(pre_save, sender=Follow)
+def follow_saving(sender, instance, **kwargs):
+    instance.saved_pair = None
+    if instance.pk:
+        instance.saved_pair = Follow.objects.filter(
+            pk=instance.pk
+        ).values_list('user_id', 'author_id').first()
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        started_following(instance)
+        return
+    pair = (instance.user_id, instance.author_id)
+    if instance.saved_pair and instance.saved_pair != pair:
+        # Правка подписки в админке: старая пара отписывается, новая
+        # подписывается.
+        user_id, author_id = instance.saved_pair
+        stopped_following(Follow(user_id=user_id, author_id=author_id))
+        started_following(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    stopped_following(instance)
@@ -0,0 +1,101 @@
+"""Рекомендации авторов по графу подписок.
+
+Команда suggest_follows загружает все подписки в компактные массивы
+array в формате CSR: авторы пользователя из строки row лежат в
+indices[indptr[row]:indptr[row + 1]]. Рекомендации пользователя — это
+строка квадрата матрицы смежности: авторы, на которых подписаны его
+авторы, с числом таких общих подписок. Страницы читают готовую таблицу
+Suggestion одним запросом по индексу.
+"""
+from array import array
+from collections import Counter
+from heapq import nlargest
+
+from django.conf import settings
+from django.db import transaction
+
+from . import follows
+from .models import Follow, Suggestion
+
+
+class FollowGraph:
+    """Подписки всех пользователей в CSR-массивах."""
+
+    def __init__(self, rows, indptr, indices):
+        self.rows = rows
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def load(cls, chunk_size=10000):
+        rows = {}
+        indptr = array('q', [0])
+        indices = array('q')
+        edges = Follow.objects.order_by('user_id', 'author_id').values_list(
+            'user_id', 'author_id'
+        )
+        for user_id, author_id in edges.iterator(chunk_size=chunk_size):
+            if user_id not in rows:
+                rows[user_id] = len(rows)
+                indptr.append(len(indices))
+            indices.append(author_id)
+            indptr[-1] = len(indices)
+        return cls(rows, indptr, indices)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def following(self, user_id):
+        row = self.rows.get(user_id)
+        if row is None:
+            return memoryview(self.indices)[:0]
+        return memoryview(self.indices)[self.indptr[row]:self.indptr[row + 1]]
+
+    def suggest(self, user_id, limit):
+        """До limit пар (автор, число общих подписок), лучшие первыми."""
+        followed = self.following(user_id)
+        scores = Counter()
+        for author_id in followed:
+            scores.update(self.following(author_id))
+        seen = set(followed)
+        seen.add(user_id)
+        best = nlargest(
+            limit,
+            (
+                (score, -author_id) for author_id, score in scores.items()
+                if author_id not in seen
+            )
+        )
+        return [(-author_id, score) for score, author_id in best]
+
+
+def store(graph, user_ids, limit):
+    """Заменяет рекомендации пачки пользователей; число записанных."""
+    objs = [
+        Suggestion(user_id=user_id, author_id=author_id, score=score)
+        for user_id in user_ids
+        for author_id, score in graph.suggest(user_id, limit)
+    ]
+    with transaction.atomic():
+        Suggestion.objects.filter(user_id__in=user_ids).delete()
+        Suggestion.objects.bulk_create(objs)
+    return len(objs)
+
+
+def prune():
+    """Удаляет рекомендации тех, у кого не осталось подписок."""
+    deleted, _ = Suggestion.objects.filter(user__follower=None).delete()
+    return deleted
+
+
+def for_user(user, limit=None):
+    """Рекомендации для виджета без авторов, на которых уже подписан."""
+    limit = limit or settings.SUGGESTIONS_SHOWN
+    followed = follows.following(user.id)
+    # Подписки после последнего расчёта отсеиваем здесь, а не в SQL.
+    rows = Suggestion.objects.filter(user=user).select_related(
+        'author'
+    ).only('author_id', 'score', 'author__username').order_by(
+        '-score', 'author_id'
+    )[:limit * 2]
+    return [row for row in rows if row.author_id not in followed][:limit]
@@ -0,0 +1,32 @@
+from django import template
+
+from posts import caching, thumbnails, variants
+
+register = template.Library()
+
+
+@register.simple_tag
+def ready_thumbnail(image, geometry, **options):
+    """Миниатюра, если она уже готова; иначе ставит её в очередь."""
+    thumbnail = thumbnails.ready_thumbnail(image, geometry, **options)
+    if thumbnail is None and image:
+        thumbnails.enqueue(image)
+    return thumbnail
+
+
+@register.simple_tag
+def prefetch_thumbnails(posts, geometry, **options):
+    """Заранее находит миниатюры и варианты картинок всей страницы.
+
+    Посты, карточки которых уже лежат в кэше фрагментов, пропускаются.
+    """
+    posts = caching.uncached_cards(posts)
+    thumbnails.prefetch(posts, geometry, **options)
+    variants.prefetch(posts)
+    return ''
+
+
+@register.simple_tag
+def image_sources(image):
+    """Варианты картинки для <source> внутри <picture>."""
+    return variants.sources(image)
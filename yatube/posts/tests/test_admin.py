@@ -0,0 +1,98 @@
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.utils import AdminPaginator
+
+
+class LargeTableAdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {number}',
+                slug=f'group-{number}'
+            )
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def create_rows(self, count):
+        """Строки без сигналов: админке не нужны счётчики и ленты."""
+        start = User.objects.count()
+        User.objects.bulk_create(
+            User(username=f'user{start + number}')
+            for number in range(count)
+        )
+        users = User.objects.order_by('-id')[:count]
+        Post.objects.bulk_create(
+            Post(
+                author=user,
+                text=f'Пост {user.id}',
+                group=self.groups[user.id % len(self.groups)]
+            )
+            for user in users
+        )
+        Comment.objects.bulk_create(
+            Comment(post=post, author_id=post.author_id, text='Текст')
+            for post in Post.objects.order_by('-id')[:count]
+        )
+        Follow.objects.bulk_create(
+            Follow(user=user, author=self.admin) for user in users
+        )
+
+    def changelist_queries(self, model):
+        url = reverse(f'admin:posts_{model}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries]
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.create_rows(2)
+        few = {
+            model: self.changelist_queries(model)
+            for model in ('post', 'comment', 'follow')
+        }
+        self.create_rows(30)
+        for model, queries in few.items():
+            with self.subTest(model=model):
+                many = self.changelist_queries(model)
+                self.assertEqual(len(many), len(queries))
+                self.assertFalse(any(
+                    'COUNT(*)' in sql and 'LIMIT' not in sql
+                    for sql in many
+                ))
+
+    def test_foreign_keys_use_autocomplete(self):
+        self.create_rows(1)
+        post = Post.objects.get()
+        response = self.client.get(
+            reverse('admin:posts_post_change', args=[post.id])
+        )
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertContains(response, post.group.title)
+        self.assertNotContains(response, self.groups[-1].title)
+
+    @override_settings(ADMIN_COUNT_LIMIT=4)
+    def test_admin_paginator(self):
+        self.create_rows(7)
+        posts = Post.objects.order_by('id')
+        paginator = AdminPaginator(posts, 3)
+        self.assertEqual(paginator.count, 4)
+        self.assertTrue(paginator.capped)
+        self.assertEqual(paginator.num_pages, 2)
+        self.assertEqual(
+            list(paginator.page(2).object_list),
+            list(posts[3:6])
+        )
+        self.assertFalse(AdminPaginator(posts[:4], 3).capped)
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertContains(response, '4+ Посты')
@@ -0,0 +1,161 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import caching
+from posts.models import Comment, Group, Post, User
+
+
+class FeedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_slug',
+            description='Тестовое описание',
+        )
+        for number in range(settings.PAGE_SIZE + 3):
+            Post.objects.create(
+                author=cls.user,
+                text=f'Пост номер {number}',
+                group=cls.group
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        ]
+
+    def test_tests_do_not_share_dev_cache(self):
+        """Тесты не пишут в кэш, которым пользуется dev-сервер."""
+        self.assertFalse(settings.CACHES['shared']['LOCATION'].startswith(
+            settings.BASE_DIR
+        ))
+
+    def test_pages_are_cached_separately(self):
+        """Вторая страница не отдаёт закэшированную первую."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.guest_client.get(url)
+                response = self.guest_client.get(url + '?page=2')
+                self.assertContains(response, 'Пост номер 0')
+                self.assertNotContains(response, 'Пост номер 12')
+
+    def test_new_and_deleted_posts_are_visible_at_once(self):
+        for url in self.urls:
+            self.guest_client.get(url)
+        post = Post.objects.create(
+            author=self.user,
+            text='Свежий пост',
+            group=self.group
+        )
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), 'Свежий пост')
+        post.delete()
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertNotContains(
+                    self.guest_client.get(url), 'Свежий пост'
+                )
+
+    def test_comment_updates_count_without_bumping_feeds(self):
+        """Комментарий меняет число на карточке, но не поколения лент."""
+        scopes = ['index', f'group:{self.group.id}', f'author:{self.user.id}']
+        for url in self.urls:
+            self.guest_client.get(url)
+        before = caching.generations(*scopes)
+        post = Post.objects.filter(group=self.group).latest('pub_date')
+        Comment.objects.create(post=post, author=self.user, text='Ого')
+        self.assertEqual(caching.generations(*scopes), before)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.guest_client.get(url),
+                    '(комментариев: 1)'
+                )
+
+    def test_moving_post_refreshes_old_group(self):
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        self.guest_client.get(url)
+        post = Post.objects.filter(group=self.group).first()
+        post.group = self.other_group
+        post.save()
+        self.assertNotContains(self.guest_client.get(url), post.text)
+
+
+class AnonymousResponseCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Текст',
+            group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        ]
+
+    def test_not_modified(self):
+        """Совпавший валидатор отдаёт 304 без рендеринга шаблона."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                etag = response['ETag']
+                response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertIsNone(response.context)
+                response = self.guest_client.get(
+                    url,
+                    HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_full_response_is_cached(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url)
+                second = self.guest_client.get(url)
+                self.assertIsNone(second.context)
+                self.assertEqual(first.content, second.content)
+
+    def test_comment_changes_post_validator(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        etag = self.guest_client.get(url)['ETag']
+        self.post.comments.create(author=self.user, text='Комментарий')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Комментарий')
+
+    def test_authorized_requests_are_not_cached(self):
+        client = Client()
+        client.force_login(self.user)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertFalse(client.get(url).has_header('ETag'))
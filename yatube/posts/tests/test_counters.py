@@ -0,0 +1,164 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, Profile, User
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def test_counters_follow_creates_and_deletes(self):
+        """Счётчики меняются при создании и удалении объектов."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        comment = Comment.objects.create(
+            post=post,
+            author=self.reader,
+            text='Комментарий'
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Profile.objects.get(user=self.author).posts_count, 1)
+        self.assertEqual(
+            Profile.objects.get(user=self.author).followers_count, 1
+        )
+        self.assertEqual(
+            Profile.objects.get(user=self.reader).following_count, 1
+        )
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(
+            Profile.objects.get(user=self.author).followers_count, 0
+        )
+
+    def profile(self, user):
+        return Profile.objects.get(user=user)
+
+    def test_reassigned_rows_move_counters(self):
+        """Перенос комментария, смена автора поста и правка подписки."""
+        other = User.objects.create_user(username='other')
+        first, second = [
+            Post.objects.create(author=self.author, text='Пост')
+            for _ in range(2)
+        ]
+        comment = Comment.objects.create(
+            post=first, author=self.reader, text='Текст'
+        )
+        comment.post = second
+        comment.save()
+        self.assertEqual(
+            list(Post.objects.order_by('id').values_list(
+                'comments_count', flat=True
+            )),
+            [0, 1]
+        )
+        comment.delete()
+        first.author = other
+        first.save()
+        self.assertEqual(self.profile(self.author).posts_count, 1)
+        self.assertEqual(self.profile(other).posts_count, 1)
+        first.delete()
+        self.assertEqual(self.profile(other).posts_count, 0)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        follow.author = other
+        follow.save()
+        self.assertEqual(self.profile(self.author).followers_count, 0)
+        self.assertEqual(self.profile(other).followers_count, 1)
+        self.assertEqual(self.profile(self.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.profile(other).followers_count, 0)
+
+    def test_decrements_do_not_go_below_zero(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Текст'
+        )
+        Post.objects.filter(pk=post.pk).update(comments_count=0)
+        Profile.objects.filter(user=self.author).update(posts_count=0)
+        comment.delete()
+        post.delete()
+        self.assertEqual(self.profile(self.author).posts_count, 0)
+
+    def test_profile_shows_counters(self):
+        Post.objects.create(author=self.author, text='Пост')
+        response = Client().get(reverse(
+            'posts:profile',
+            kwargs={'username': self.author.username}
+        ))
+        self.assertContains(response, 'Всего постов: 1')
+
+    def test_reconcile_fixes_drift(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.reader, text='Текст')
+        Profile.objects.filter(user=self.author).update(posts_count=7)
+        Post.objects.filter(pk=post.pk).update(comments_count=0)
+        Profile.objects.filter(user=self.reader).delete()
+        out = StringIO()
+        call_command('reconcile_counters', chunk_size=1, stdout=out)
+        self.assertEqual(Profile.objects.get(user=self.author).posts_count, 1)
+        self.assertTrue(Profile.objects.filter(user=self.reader).exists())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertIn('Исправлено профилей: 2, постов: 1', out.getvalue())
+
+
+class FillCountersMigrationTests(TransactionTestCase):
+    """Миграция 0012 заполняет счётчики для уже существующих данных."""
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.migrate([target])
+        executor.loader.build_graph()
+        return executor.loader.project_state(target).apps
+
+    def test_counters_are_filled(self):
+        latest = MigrationExecutor(connection).loader.graph.leaf_nodes('posts')
+        self.addCleanup(self.migrate, latest[0])
+        apps = self.migrate(('posts', '0011_timeline'))
+        User = apps.get_model('auth', 'User')
+        Post = apps.get_model('posts', 'Post')
+        Comment = apps.get_model('posts', 'Comment')
+        Follow = apps.get_model('posts', 'Follow')
+        author, reader, other = [
+            User.objects.create(username=name)
+            for name in ('author', 'reader', 'other')
+        ]
+        posts = [
+            Post.objects.create(author=author, text='Пост')
+            for _ in range(2)
+        ]
+        for user in (author, reader, other):
+            Comment.objects.create(post=posts[0], author=user, text='Ого')
+        for user in (reader, other):
+            Follow.objects.create(user=user, author=author)
+        apps = self.migrate(('posts', '0012_counters'))
+        Profile = apps.get_model('posts', 'Profile')
+        counts = {
+            profile.user_id: (
+                profile.posts_count,
+                profile.followers_count,
+                profile.following_count,
+            )
+            for profile in Profile.objects.all()
+        }
+        self.assertEqual(counts, {
+            author.id: (2, 2, 0),
+            reader.id: (0, 0, 1),
+            other.id: (0, 0, 1),
+        })
+        Post = apps.get_model('posts', 'Post')
+        self.assertEqual(
+            dict(Post.objects.values_list('id', 'comments_count')),
+            {posts[0].id: 3, posts[1].id: 0}
+        )
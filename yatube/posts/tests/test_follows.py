@@ -0,0 +1,68 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import follows
+from posts.models import Follow, Post, Profile, User
+
+
+class FollowsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_is_following_answers_many_authors_from_cache(self):
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        ids = [author.id for author in self.authors]
+        follows.following(self.reader.id)
+        with self.assertNumQueries(0):
+            state = follows.is_following(self.reader, ids)
+        self.assertEqual(state, {ids[0]: True, ids[1]: False, ids[2]: False})
+        self.assertEqual(
+            follows.is_following(AnonymousUser(), ids),
+            dict.fromkeys(ids, False)
+        )
+
+    def test_follow_and_unfollow_refresh_cached_set(self):
+        author = self.authors[1]
+        self.assertEqual(follows.following(self.reader.id), frozenset())
+        self.assertTrue(follows.follow(self.reader.id, author.id))
+        self.assertEqual(follows.following(self.reader.id), {author.id})
+        self.assertTrue(follows.unfollow(self.reader.id, author.id))
+        self.assertEqual(follows.following(self.reader.id), frozenset())
+        self.assertFalse(follows.unfollow(self.reader.id, author.id))
+
+    def test_repeated_follow_is_single_insert(self):
+        author = self.authors[2]
+        follows.follow(self.reader.id, author.id)
+        with self.assertNumQueries(4):
+            # Точка сохранения, INSERT с ошибкой уникальности, откат к
+            # точке и её освобождение — без предварительного SELECT.
+            self.assertFalse(follows.follow(self.reader.id, author.id))
+        self.assertFalse(follows.follow(self.reader.id, self.reader.id))
+        self.assertEqual(Follow.objects.filter(user=self.reader).count(), 1)
+        self.assertEqual(
+            Profile.objects.get(user=author).followers_count, 1
+        )
+
+    def test_feed_cards_show_follow_state(self):
+        Post.objects.create(author=self.authors[0], text='Пост')
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'вы подписаны')
+        client.get(reverse(
+            'posts:profile_follow',
+            kwargs={'username': self.authors[0].username}
+        ))
+        response = client.get(reverse('posts:index'))
+        self.assertContains(response, 'вы подписаны')
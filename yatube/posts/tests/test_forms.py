@@ -1,6 +1,10 @@
+import hashlib
+import io
+
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from posts.forms import PostForm
 from posts.models import Group, Post, User, Follow
@@ -146,9 +150,8 @@ class PostFormTests(TestCase):
             post.text == form_data['text']
             and post.group_id == form_data['group']
         )
-        self.assertTrue(
-            form_data['image'].name.split('.')[0] in post.image.name
-        )
+        digest = hashlib.sha256(small_gif).hexdigest()
+        self.assertEqual(post.image.name, f'posts/{digest[:2]}/{digest}.gif')
 
     def test_subscribe_user(self):
         author = User.objects.create_user(username='author')
@@ -157,3 +160,58 @@ class PostFormTests(TestCase):
         self.assertEqual(follow.author, author)
         Follow.objects.filter(user=self.user).delete()
         self.assertFalse(Follow.objects.filter(user=self.user).exists())
+
+
+@override_settings(IMAGE_INGEST_SIZE=(100, 100), IMAGE_MAX_PIXELS=10 ** 6)
+class PostFormImageTests(TestCase):
+    @staticmethod
+    def upload(size, format_='JPEG', exif=None):
+        buffer = io.BytesIO()
+        image = Image.new('RGB', size, 'red')
+        if exif is not None:
+            image.save(buffer, format_, exif=exif)
+        else:
+            image.save(buffer, format_)
+        return SimpleUploadedFile(
+            name=f'photo.{format_.lower()}',
+            content=buffer.getvalue(),
+            content_type=f'image/{format_.lower()}'
+        )
+
+    def clean_image(self, upload):
+        form = PostForm(data={'text': 'Текст'}, files={'image': upload})
+        self.assertTrue(form.is_valid(), form.errors)
+        return form.cleaned_data['image']
+
+    def test_small_image_kept(self):
+        """Небольшая картинка без EXIF сохраняется как есть."""
+        upload = self.upload((50, 40), 'PNG')
+        self.assertIs(self.clean_image(upload), upload)
+
+    def test_large_image_downscaled(self):
+        """Крупная картинка уменьшается до IMAGE_INGEST_SIZE."""
+        image = self.clean_image(self.upload((400, 200), 'PNG'))
+        self.assertEqual(image.name, 'photo.png')
+        with Image.open(image) as processed:
+            self.assertEqual(processed.size, (100, 50))
+
+    def test_exif_stripped_and_applied(self):
+        """EXIF удаляется, а поворот из него применяется к картинке."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        image = self.clean_image(self.upload((60, 30), exif=exif.tobytes()))
+        with Image.open(image) as processed:
+            self.assertEqual(processed.size, (30, 60))
+            self.assertFalse(processed.getexif())
+
+    def test_pixel_limit(self):
+        """Картинка больше IMAGE_MAX_PIXELS отклоняется до декодирования."""
+        form = PostForm(
+            data={'text': 'Текст'},
+            files={'image': self.upload((2000, 1000))}
+        )
+        self.assertFalse(form.is_valid())
+        self.assertEqual(
+            form.errors.as_data()['image'][0].code,
+            'too_many_pixels'
+        )
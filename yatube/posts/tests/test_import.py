@@ -0,0 +1,201 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import export
+from posts.models import Comment, Follow, Group, Post, Profile, Timeline, User
+
+ROWS = [
+    {'type': 'user', 'id': 'u1', 'username': 'auth'},
+    {'type': 'user', 'id': 'u2', 'username': 'reader'},
+    {'type': 'group', 'id': 'g1', 'title': 'Группа', 'slug': 'imported'},
+    {
+        'type': 'post', 'id': 'p1', 'author': 'u1', 'group': 'g1',
+        'text': 'Старый пост', 'pub_date': '2015-05-01T10:00:00+00:00',
+    },
+    {'type': 'post', 'id': 'p2', 'author': 'u1', 'text': 'Новый пост'},
+    {'type': 'post', 'id': 'p3', 'author': 'missing', 'text': 'Сирота'},
+    {'type': 'comment', 'id': 'c1', 'post': 'p1', 'author': 'u2',
+     'text': 'Комментарий'},
+    {'type': 'follow', 'user': 'u2', 'author': 'u1'},
+    {'type': 'follow', 'user': 'u1', 'author': 'u1'},
+]
+
+
+class ImportContentTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.existing = User.objects.create_user(username='auth')
+
+    def run_import(self, rows, suffix='.jsonl', **options):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix=suffix, delete=False, encoding='utf-8'
+        ) as file:
+            if suffix == '.csv':
+                fields = sorted({key for row in rows for key in row})
+                file.write(','.join(fields) + '\n')
+                for row in rows:
+                    file.write(
+                        ','.join(row.get(field, '') for field in fields)
+                        + '\n'
+                    )
+            else:
+                for row in rows:
+                    file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self.addCleanup(os.remove, file.name)
+        out, err = StringIO(), StringIO()
+        call_command(
+            'import_content', file.name, stdout=out, stderr=err, **options
+        )
+        return out.getvalue(), err.getvalue()
+
+    def test_import_jsonl(self):
+        out, err = self.run_import(ROWS, batch_size=2)
+        self.assertIn('Загружено записей: 6, пропущено: 1', out)
+        self.assertIn('Строка 6 пропущена', err)
+        reader = User.objects.get(username='reader')
+        group = Group.objects.get(slug='imported')
+        old = Post.objects.get(text='Старый пост')
+        self.assertEqual(old.author, self.existing)
+        self.assertEqual(old.group, group)
+        self.assertEqual(
+            old.pub_date,
+            datetime(2015, 5, 1, 10, tzinfo=timezone.utc)
+        )
+        self.assertEqual(old.comments_count, 1)
+        self.assertEqual(Comment.objects.get().author, reader)
+        self.assertTrue(
+            Follow.objects.filter(user=reader, author=self.existing).exists()
+        )
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(
+            Timeline.objects.filter(user=reader).count(),
+            2
+        )
+        profile = Profile.objects.get(user=self.existing)
+        self.assertEqual(
+            (profile.posts_count, profile.followers_count),
+            (2, 1)
+        )
+        self.assertEqual(Profile.objects.get(user=reader).following_count, 1)
+        post = Post.objects.create(author=reader, text='После импорта')
+        self.assertGreater(post.id, old.id)
+
+    def test_import_csv(self):
+        rows = [row for row in ROWS[:5]]
+        out, _ = self.run_import(rows, suffix='.csv')
+        self.assertIn('Загружено записей: 4, пропущено: 0', out)
+        self.assertEqual(
+            Post.objects.get(text='Старый пост').pub_date.year,
+            2015
+        )
+
+
+class ExportContentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='group',
+            description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            group=cls.group,
+            text='Пост'
+        )
+        Post.objects.create(author=cls.reader, text='Чужой пост')
+        Comment.objects.create(
+            post=cls.post,
+            author=cls.reader,
+            text='Комментарий'
+        )
+
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def test_profile_export_view(self):
+        """Выгрузка автора: пользователи, группа, посты и комментарии."""
+        response = self.client.get(
+            reverse('posts:profile_export', args=[self.author.username])
+        )
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="auth.jsonl"'
+        )
+        records = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            [(record['type'], record['id']) for record in records],
+            [
+                ('user', self.author.id),
+                ('user', self.reader.id),
+                ('group', self.group.id),
+                ('post', self.post.id),
+                ('comment', Comment.objects.get().id),
+            ]
+        )
+
+    def test_group_export_csv(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(
+            reverse('posts:group_export', args=[self.group.slug]),
+            {'format': 'csv'}
+        )
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], ','.join(export.FIELDS))
+        self.assertEqual(len(lines), 6)
+
+    def test_export_is_limited_to_owner_and_staff(self):
+        """Чужой профиль и группу выгрузить нельзя, персоналу можно."""
+        self.client.force_login(self.reader)
+        profile_url = reverse(
+            'posts:profile_export', args=[self.author.username]
+        )
+        self.assertRedirects(
+            self.client.get(profile_url),
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.assertRedirects(
+            self.client.get(
+                reverse('posts:group_export', args=[self.group.slug])
+            ),
+            reverse('posts:group_list', args=[self.group.slug])
+        )
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(profile_url).status_code, 200)
+
+    def test_export_requires_login(self):
+        self.client.logout()
+        url = reverse('posts:group_export', args=[self.group.slug])
+        self.assertRedirects(
+            self.client.get(url),
+            f'/auth/login/?next={url}'
+        )
+
+    def test_export_import_round_trip(self):
+        """Выгрузка команды читается командой import_content."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dump.jsonl')
+            call_command('export_content', '--author', 'auth', '-o', path)
+            Post.objects.all().delete()
+            call_command('import_content', path, stdout=StringIO())
+        post = Post.objects.get()
+        self.assertEqual(
+            (post.author, post.group, post.text, post.comments_count),
+            (self.author, self.group, 'Пост', 1)
+        )
@@ -0,0 +1,156 @@
+from unittest import skipUnless
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Follow, Group, Post, Timeline, User
+from posts.timeline import CURSOR_FIELDS, follow_feed
+from posts.utils import CursorPaginator, comments_page, encode_cursor
+
+USERS = 200
+GROUPS = 20
+POSTS = 20000
+COMMENTS = 20000
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class FeedIndexesTest(TestCase):
+    """Планы запросов лент используют составные индексы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(username=f'user{number}') for number in range(USERS)
+        )
+        users = list(User.objects.values_list('id', flat=True))
+        Group.objects.bulk_create(
+            Group(title=f'Группа {number}', slug=f'group{number}',
+                  description='Описание')
+            for number in range(GROUPS)
+        )
+        groups = list(Group.objects.values_list('id', flat=True))
+        Post.objects.bulk_create(
+            (
+                Post(
+                    text='Текст',
+                    author_id=users[number % USERS],
+                    group_id=groups[number % GROUPS],
+                )
+                for number in range(POSTS)
+            ),
+            batch_size=500
+        )
+        posts = list(Post.objects.values_list('id', 'pub_date'))
+        Comment.objects.bulk_create(
+            (
+                Comment(
+                    text='Комментарий',
+                    post_id=posts[number % POSTS][0],
+                    author_id=users[number % USERS],
+                )
+                for number in range(COMMENTS)
+            ),
+            batch_size=500
+        )
+        Follow.objects.bulk_create(
+            Follow(user_id=users[0], author_id=author)
+            for author in users[1:50]
+        )
+        Timeline.objects.bulk_create(
+            (
+                Timeline(user_id=users[0], post_id=post_id, pub_date=date)
+                for post_id, date in posts[::10]
+            ),
+            batch_size=500
+        )
+        cls.user = User.objects.get(id=users[0])
+        cls.author = User.objects.get(id=users[1])
+        cls.group = Group.objects.get(id=groups[0])
+        cls.post = Post.objects.get(id=posts[0][0])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertRegex(plan, rf'INDEX {index}\b')
+        self.assertNotIn('TEMP B-TREE', plan, plan)
+
+    def test_feeds_use_indexes(self):
+        page = slice(0, settings.PAGE_SIZE)
+        querysets = {
+            'post_date_idx': Post.objects.for_feed()[page],
+            'post_group_date_idx': self.group.posts.for_feed()[page],
+            'post_author_date_idx': self.author.posts.for_feed()[page],
+            'timeline_user_date_idx': follow_feed(self.user).for_feed()[page],
+            'comment_post_date_idx': self.post.comments.select_related(
+                'author'
+            ),
+            'follow_author_user_idx': Follow.objects.filter(
+                author=self.author
+            ).values_list('user_id', flat=True),
+            'sqlite_autoindex_posts_follow_1': Follow.objects.filter(
+                user=self.user,
+                author=self.author
+            ),
+        }
+        for index, queryset in querysets.items():
+            with self.subTest(index=index):
+                self.assertUsesIndex(queryset, index)
+
+    def page_plans(self, get_page):
+        """Планы запросов, которые на деле выполнила пагинация курсором."""
+        with CaptureQueriesContext(connection) as queries:
+            get_page()
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans.append(
+                    '\n'.join(str(row[-1]) for row in cursor.fetchall())
+                )
+        return plans
+
+    def test_cursor_pages_use_indexes(self):
+        middle = Post.objects.order_by('-pub_date', '-id')[POSTS // 2]
+        cursor = encode_cursor(middle.pub_date, middle.id)
+        feeds = {
+            'post_date_idx': CursorPaginator(
+                Post.objects.for_feed(), settings.PAGE_SIZE
+            ),
+            'post_group_date_idx': CursorPaginator(
+                self.group.posts.for_feed(), settings.PAGE_SIZE
+            ),
+            'post_author_date_idx': CursorPaginator(
+                self.author.posts.for_feed(), settings.PAGE_SIZE
+            ),
+            'timeline_user_date_idx': CursorPaginator(
+                follow_feed(self.user).for_feed(),
+                settings.PAGE_SIZE,
+                fields=CURSOR_FIELDS
+            ),
+        }
+        pages = {
+            'first': {},
+            'after': {'after': cursor},
+            'before': {'before': cursor},
+        }
+        for index, paginator in feeds.items():
+            for page, params in pages.items():
+                with self.subTest(index=index, page=page):
+                    plans = self.page_plans(
+                        lambda: paginator.get_page(**params)
+                    )
+                    self.assertEqual(len(plans), 1)
+                    self.assertRegex(plans[0], rf'INDEX {index}\b')
+                    self.assertNotIn('TEMP B-TREE', plans[0], plans[0])
+        comment = self.post.comments.first()
+        cursor = encode_cursor(comment.pub_date, comment.id)
+        for params in ({}, {'after': cursor}):
+            with self.subTest(index='comment_post_date_idx', **params):
+                plans = self.page_plans(
+                    lambda: comments_page(self.post.id, **params)
+                )
+                self.assertRegex(plans[0], r'INDEX comment_post_date_idx\b')
+                self.assertNotIn('TEMP B-TREE', plans[0], plans[0])
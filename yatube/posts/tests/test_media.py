@@ -0,0 +1,134 @@
+import hashlib
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts import media, thumbnails
+from posts.models import ImageVariant, MediaFile, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+DIGEST = hashlib.sha256(SMALL_GIF).hexdigest()
+CONTENT_NAME = f'posts/{DIGEST[:2]}/{DIGEST}.gif'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.storage = Post.image.field.storage
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name):
+        return Post.objects.create(
+            author=self.user,
+            text='Текст',
+            image=SimpleUploadedFile(
+                name=name,
+                content=SMALL_GIF,
+                content_type='image/gif'
+            )
+        )
+
+    def test_identical_uploads_share_file(self):
+        """Одинаковые картинки хранятся одним файлом с общим счётчиком."""
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        self.assertEqual(first.image.name, CONTENT_NAME)
+        self.assertEqual(second.image.name, CONTENT_NAME)
+        self.assertEqual(
+            MediaFile.objects.get(name=CONTENT_NAME).references, 2
+        )
+        first.delete()
+        self.assertEqual(
+            MediaFile.objects.get(name=CONTENT_NAME).references, 1
+        )
+        second.delete()
+        self.assertFalse(MediaFile.objects.filter(name=CONTENT_NAME).exists())
+        self.assertTrue(self.storage.exists(CONTENT_NAME))
+        media.remove(CONTENT_NAME)
+        self.assertFalse(self.storage.exists(CONTENT_NAME))
+
+    def test_dedupe_media(self):
+        """Команда переносит старые файлы под хэш и удаляет дубликаты."""
+        legacy = ['posts/meme.gif', 'posts/meme_copy.gif']
+        for name in legacy:
+            self.storage._save(name, ContentFile(SMALL_GIF))
+            Post.objects.create(author=self.user, text='Текст', image=name)
+        out = StringIO()
+        call_command('dedupe_media', chunk_size=1, stdout=out)
+        self.assertIn(
+            'Перенесено файлов: 1, удалено дубликатов: 1',
+            out.getvalue()
+        )
+        self.assertEqual(
+            set(Post.objects.values_list('image', flat=True)),
+            {CONTENT_NAME}
+        )
+        for name in legacy:
+            self.assertFalse(self.storage.exists(name))
+        self.assertTrue(self.storage.exists(CONTENT_NAME))
+        self.assertEqual(
+            list(MediaFile.objects.values_list('name', 'references')),
+            [(CONTENT_NAME, 2)]
+        )
+
+    def test_collect_media(self):
+        """Файлы без ссылок выводятся, а с --delete удаляются."""
+        post = self.create_post('kept.gif')
+        thumbnails.generate(post.image.name)
+        geometry, options = thumbnails.GEOMETRIES[0]
+        thumbnail = thumbnails.ready_thumbnail(post.image, geometry, **options)
+        orphans = [
+            self.storage._save('posts/orphan.gif', ContentFile(SMALL_GIF)),
+            self.storage._save('cache/ab/cd/orphan.jpg', ContentFile(b'x')),
+        ]
+        variant = ImageVariant.objects.create(
+            source=orphans[0],
+            width=480,
+            mime_type='image/gif',
+            file=self.storage._save(
+                'posts/orphan_480w.gif', ContentFile(SMALL_GIF)
+            )
+        )
+        out = StringIO()
+        call_command('collect_media', stdout=out)
+        self.assertIn('Найдено файлов без ссылок: 0', out.getvalue())
+        out = StringIO()
+        call_command('collect_media', min_age=0, stdout=out)
+        self.assertEqual(out.getvalue().splitlines()[:-1], orphans)
+        call_command('collect_media', min_age=0, delete=True, stdout=out)
+        for name in orphans:
+            self.assertFalse(self.storage.exists(name))
+        self.assertFalse(self.storage.exists(variant.file.name))
+        self.assertFalse(
+            ImageVariant.objects.filter(source=orphans[0]).exists()
+        )
+        self.assertTrue(self.storage.exists(post.image.name))
+        self.assertTrue(self.storage.exists(thumbnail.name))
@@ -0,0 +1,86 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import popular
+from posts.models import Comment, PopularPost, Post, User
+
+
+class PopularTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        cache.clear()
+
+    def comment(self, post, count=1):
+        for _ in range(count):
+            Comment.objects.create(post=post, author=self.user, text='Ого')
+
+    def popularity(self, post):
+        post.refresh_from_db()
+        return post.popularity
+
+    def test_comments_score_incrementally_and_decay(self):
+        post = Post.objects.create(author=self.user, text='Пост')
+        self.comment(post, 3)
+        self.assertEqual(self.popularity(post), 3)
+        popular.decay(settings.POPULAR_HALF_LIFE)
+        self.assertAlmostEqual(self.popularity(post), 1.5)
+        popular.decay(settings.POPULAR_HALF_LIFE * 20)
+        self.assertEqual(self.popularity(post), 0)
+
+    def test_rebuild_weights_comments_by_age(self):
+        old, fresh = [
+            Post.objects.create(author=self.user, text=text)
+            for text in ('Старый', 'Свежий')
+        ]
+        self.comment(old, 2)
+        self.comment(fresh, 1)
+        now = timezone.now()
+        Comment.objects.filter(post=old).update(
+            pub_date=now - timedelta(seconds=settings.POPULAR_HALF_LIFE * 2)
+        )
+        Comment.objects.filter(post=fresh).update(pub_date=now)
+        self.assertEqual(popular.rebuild(now), 2)
+        self.assertAlmostEqual(self.popularity(old), 0.5)
+        self.assertAlmostEqual(self.popularity(fresh), 1)
+
+    @override_settings(PAGE_SIZE=2)
+    def test_popular_page_is_a_slice_of_ranked_list(self):
+        posts = [
+            Post.objects.create(author=self.user, text=f'Пост {number}')
+            for number in range(4)
+        ]
+        Post.objects.create(author=self.user, text='Без комментариев')
+        for count, post in enumerate(posts, 1):
+            self.comment(post, count)
+        call_command('rank_popular', stdout=StringIO())
+        self.assertEqual(PopularPost.objects.count(), 4)
+        url = reverse('posts:popular')
+        response = self.client.get(url)
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [posts[3], posts[2]]
+        )
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'page': 2, 'fresh': 1})
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [posts[1], posts[0]]
+        )
+
+    def test_ranking_is_rebuilt_from_table_without_cache(self):
+        post = Post.objects.create(author=self.user, text='Пост')
+        self.comment(post)
+        popular.materialize()
+        cache.clear()
+        self.assertEqual(popular.ranked_ids(), [post.id])
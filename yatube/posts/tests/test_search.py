@@ -0,0 +1,158 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post, User
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def found(self, query):
+        return sorted(post.id for post in search.ranked(query))
+
+    def test_index_follows_post_writes(self):
+        post = Post.objects.create(author=self.user, text='Зимняя прогулка')
+        Post.objects.bulk_create([
+            Post(author=self.user, text='Летняя ПРОГУЛКА по лесу'),
+        ])
+        bulk_id = Post.objects.get(text__startswith='Летняя').id
+        self.assertEqual(self.found('прогулк'), [post.id, bulk_id])
+        self.assertEqual(self.found('лето'), [])
+        post.text = 'Осенний дождь'
+        post.save()
+        self.assertEqual(self.found('прогулк'), [bulk_id])
+        self.assertEqual(self.found('дожд'), [post.id])
+        Post.objects.filter(id=bulk_id).update(text='Летний дождь')
+        self.assertEqual(self.found('дожд'), [post.id, bulk_id])
+        post.delete()
+        self.assertEqual(self.found('дожд'), [bulk_id])
+
+    def test_all_words_must_match(self):
+        both = Post.objects.create(author=self.user, text='Кот и собака')
+        Post.objects.create(author=self.user, text='Кот и мышь')
+        self.assertEqual(self.found('собака кот'), [both.id])
+        self.assertIsNone(search.match_expression('и а'))
+        self.assertEqual(self.found('"кот'), [])
+
+    @override_settings(PAGE_SIZE=3)
+    def test_cursor_pages_cover_all_results(self):
+        for number in range(8):
+            Post.objects.create(
+                author=self.user,
+                text='птица ' * (number + 1) + 'в небе'
+            )
+        Post.objects.create(author=self.user, text='Без совпадений')
+        ids = []
+        after = None
+        while True:
+            page = search.page('птица', after=after)
+            ids.extend(post.id for post in page)
+            if not page.has_next():
+                break
+            after = page.next_cursor
+        self.assertEqual(len(ids), 8)
+        self.assertEqual(len(set(ids)), 8)
+        self.assertEqual(
+            ids,
+            [post.id for post in search.ranked('птица')]
+        )
+
+    @override_settings(PAGE_SIZE=10)
+    def test_common_word_ranks_in_one_pass(self):
+        """bm25 считается в одном проходе по FTS, без подзапроса на пост."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'общий текст {number}')
+            for number in range(300)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            page = search.page('общий')
+            after = search.page('общий', after=page.next_cursor)
+        self.assertEqual(len(page), 10)
+        self.assertEqual(len(after), 10)
+        self.assertFalse(set(page) & set(after))
+        self.assertEqual(len(queries), 4)
+        with connection.cursor() as cursor:
+            for query in queries:
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+                self.assertNotIn('CORRELATED', plan)
+
+    def test_search_page(self):
+        post = Post.objects.create(author=self.user, text='Найди меня')
+        response = self.client.get(reverse('posts:search'), {'q': 'НАЙДИ'})
+        self.assertEqual(list(response.context['page_obj']), [post])
+        response = self.client.get(reverse('posts:search'), {'q': 'на'})
+        self.assertIsNone(response.context['page_obj'])
+        self.assertTrue(response.context['form'].errors)
+
+    def test_query_without_long_words_finds_nothing(self):
+        Post.objects.create(author=self.user, text='ab cd ef')
+        response = self.client.get(reverse('posts:search'), {'q': 'ab cd'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['page_obj']), [])
+        self.assertContains(response, 'Ничего не найдено')
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        posts = [
+            Post.objects.create(author=self.user, text=f'Искомый текст {n}')
+            for n in range(2)
+        ]
+        Post.objects.create(author=self.user, text='Другой пост')
+        client = Client()
+        client.force_login(admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(
+                reverse('admin:posts_post_changelist'), {'q': 'искомый'}
+            )
+        self.assertEqual(
+            sorted(response.context['cl'].result_list, key=lambda p: p.id),
+            posts
+        )
+        self.assertTrue(any(
+            search.TABLE in query['sql'] for query in queries
+        ))
+        self.assertFalse(any(
+            'LIKE' in query['sql'] for query in queries
+        ))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'FTS5 есть только в SQLite')
+class SearchTriggersMigrationTests(TransactionTestCase):
+    """Триггеры индекса переживают миграции, пересобирающие posts_post."""
+    TRIGGERS = {
+        f'{search.TABLE}_insert',
+        f'{search.TABLE}_delete',
+        f'{search.TABLE}_update',
+    }
+
+    def triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                "AND tbl_name = 'posts_post'"
+            )
+            return {name for name, in cursor.fetchall()}
+
+    def migrate(self, name):
+        executor = MigrationExecutor(connection)
+        executor.migrate([('posts', name)])
+
+    def test_triggers_exist_after_migrate(self):
+        self.assertEqual(self.triggers(), self.TRIGGERS)
+        latest = MigrationExecutor(connection).loader.graph.leaf_nodes('posts')
+        self.migrate('0018_comment_date_index')
+        self.assertEqual(self.triggers(), self.TRIGGERS)
+        self.migrate(latest[0][1])
+        self.assertEqual(self.triggers(), self.TRIGGERS)
@@ -0,0 +1,79 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import suggestions
+from posts.models import Follow, Suggestion, User
+
+
+class SuggestionsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader, cls.first, cls.second, cls.popular, cls.rare = [
+            User.objects.create_user(username=name)
+            for name in ('reader', 'first', 'second', 'popular', 'rare')
+        ]
+        edges = (
+            (cls.reader, cls.first),
+            (cls.reader, cls.second),
+            (cls.first, cls.popular),
+            (cls.second, cls.popular),
+            (cls.second, cls.rare),
+            (cls.second, cls.reader),
+        )
+        for user, author in edges:
+            Follow.objects.create(user=user, author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_graph_counts_co_follows(self):
+        graph = suggestions.FollowGraph.load()
+        self.assertEqual(len(graph), 3)
+        self.assertEqual(
+            sorted(graph.following(self.second.id)),
+            sorted([self.popular.id, self.rare.id, self.reader.id])
+        )
+        self.assertEqual(
+            graph.suggest(self.reader.id, 10),
+            [(self.popular.id, 2), (self.rare.id, 1)]
+        )
+        self.assertEqual(graph.suggest(self.reader.id, 1), [
+            (self.popular.id, 2)
+        ])
+        self.assertEqual(graph.suggest(self.popular.id, 10), [])
+
+    def test_command_replaces_and_prunes_suggestions(self):
+        Suggestion.objects.create(
+            user=self.popular,
+            author=self.rare,
+            score=1
+        )
+        call_command('suggest_follows', stdout=StringIO())
+        self.assertEqual(
+            list(Suggestion.objects.filter(user=self.reader).order_by(
+                '-score'
+            ).values_list('author', 'score')),
+            [(self.popular.id, 2), (self.rare.id, 1)]
+        )
+        self.assertFalse(Suggestion.objects.filter(user=self.popular).exists())
+
+    def test_follow_page_shows_suggestions(self):
+        call_command('suggest_follows', stdout=StringIO())
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [row.author for row in response.context['suggestions']],
+            [self.popular, self.rare]
+        )
+        Follow.objects.create(user=self.reader, author=self.popular)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [row.author for row in response.context['suggestions']],
+            [self.rare]
+        )
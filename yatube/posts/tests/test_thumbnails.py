@@ -0,0 +1,189 @@
+import io
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import thumbnails, variants
+from posts.models import ImageVariant, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Текст',
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=SMALL_GIF,
+                content_type='image/gif'
+            )
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        ]
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        """Пока миниатюра не готова, вместо неё выводится заглушка."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertNotContains(Client().get(url), '<img class')
+        thumbnails.generate(self.post.image.name)
+        for geometry, options in thumbnails.GEOMETRIES:
+            self.assertIsNotNone(thumbnails.ready_thumbnail(
+                self.post.image, geometry, **options
+            ))
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertContains(Client().get(url), '<img class')
+
+    @staticmethod
+    def png(color):
+        buffer = io.BytesIO()
+        Image.new('RGB', (2, 1), color).save(buffer, 'PNG')
+        return SimpleUploadedFile(
+            name='small.png',
+            content=buffer.getvalue(),
+            content_type='image/png'
+        )
+
+    def test_prefetch_looks_up_page_at_once(self):
+        """Миниатюры страницы ищутся одним запросом и запоминаются."""
+        posts = [self.post] + [
+            Post.objects.create(
+                author=self.user,
+                text='Текст',
+                image=self.png(color)
+            )
+            for color in ('red', 'green', 'blue')
+        ]
+        thumbnails.generate(self.post.image.name)
+        cache.clear()
+        geometry, options = thumbnails.GEOMETRIES[0]
+        hits = thumbnails.stats['hits']
+        misses = thumbnails.stats['misses']
+        with self.assertNumQueries(1):
+            thumbnails.prefetch(posts, geometry, **options)
+        self.assertEqual(thumbnails.stats['hits'] - hits, 1)
+        self.assertEqual(thumbnails.stats['misses'] - misses, 3)
+        with self.settings(THUMBNAIL_STATS_LOG_EVERY=1):
+            with self.assertLogs('posts.thumbnails', 'INFO') as logs:
+                thumbnails.prefetch(posts, geometry, **options)
+        self.assertIn(
+            f'попаданий {hits + 2}, промахов {misses + 6}',
+            logs.output[0]
+        )
+        with self.assertNumQueries(0):
+            ready = [
+                thumbnails.ready_thumbnail(post.image, geometry, **options)
+                for post in posts
+            ]
+        self.assertIsNotNone(ready[0])
+        self.assertEqual(ready[1:], [None] * 3)
+
+    def test_variants_in_picture_markup(self):
+        """После генерации карточка выводит srcset из вариантов картинки."""
+        thumbnails.generate(self.post.image.name)
+        variant = ImageVariant.objects.get(source=self.post.image.name)
+        self.assertEqual(variant.width, 480)
+        self.assertEqual(variant.mime_type, 'image/jpeg')
+        self.assertTrue(variant.file.storage.exists(variant.file.name))
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertContains(
+                    Client().get(url),
+                    f'srcset="{variant.file.url} 480w"'
+                )
+
+
+class RenderVariantsTests(SimpleTestCase):
+    @override_settings(IMAGE_VARIANT_PROCESSES=1)
+    def test_pool_workers_are_not_forked(self):
+        """Пул запускает процессы через forkserver, задачи в них работают."""
+        self.addCleanup(setattr, variants, '_pool', None)
+        pool = variants.get_pool()
+        self.addCleanup(pool.shutdown)
+        self.assertEqual(
+            pool._mp_context.get_start_method(), 'forkserver'
+        )
+        buffer = io.BytesIO()
+        Image.new('RGB', (600, 400), 'red').save(buffer, 'PNG')
+        content = pool.submit(
+            variants.render_variant, buffer.getvalue(), 480, 'PNG', 80
+        ).result()
+        with Image.open(io.BytesIO(content)) as image:
+            self.assertEqual(image.size, (480, 170))
+
+    def test_render_in_process_pool(self):
+        """Каждая ширина и формат кодируются отдельной задачей пула."""
+        buffer = io.BytesIO()
+        Image.new('RGB', (1000, 500), 'red').save(buffer, 'PNG')
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            with mock.patch.object(
+                pool, 'submit', wraps=pool.submit
+            ) as submit:
+                results = variants.render(
+                    buffer.getvalue(),
+                    (480, 960, 1440),
+                    [
+                        ('PNG', 'image/png', 'png'),
+                        ('JPEG', 'image/jpeg', 'jpg'),
+                    ],
+                    80,
+                    pool=pool
+                )
+        self.assertEqual(submit.call_count, 4)
+        self.assertEqual(
+            [(width, mime_type) for width, mime_type, _, _ in results],
+            [
+                (480, 'image/png'),
+                (480, 'image/jpeg'),
+                (960, 'image/png'),
+                (960, 'image/jpeg'),
+            ]
+        )
+        with Image.open(io.BytesIO(results[3][3])) as image:
+            self.assertEqual(image.size, (960, 339))
+
+    def test_rotated_photo_widths_follow_exif(self):
+        """Повёрнутый EXIF-ом снимок меряется по видимой ширине."""
+        exif = Image.Exif()
+        exif[variants.ORIENTATION] = 6
+        buffer = io.BytesIO()
+        Image.new('RGB', (1000, 500), 'red').save(
+            buffer, 'JPEG', exif=exif.tobytes()
+        )
+        self.assertEqual(
+            variants.variant_widths(buffer.getvalue(), (480, 960, 1440)),
+            [480]
+        )
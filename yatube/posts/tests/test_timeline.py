@@ -0,0 +1,124 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, Profile, Timeline, User
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed_ids(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return [post.id for post in response.context['page_obj']]
+
+    def test_new_post_is_written_to_followers(self):
+        """Новый пост попадает в ленты подписчиков при создании."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(
+            Timeline.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed_ids(), [post.id])
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        posts = [
+            Post.objects.create(author=self.author, text='Пост')
+            for _ in range(3)
+        ]
+        self.reader_client.get(reverse(
+            'posts:profile_follow',
+            kwargs={'username': self.author.username}
+        ))
+        self.assertEqual(
+            self.feed_ids(), [post.id for post in reversed(posts)]
+        )
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}
+        ))
+        self.assertFalse(Timeline.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.feed_ids(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_author_is_pulled(self):
+        """Посты авторов с множеством подписчиков читаются на лету."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.assertFalse(Timeline.objects.filter(post=post).exists())
+        self.assertEqual(self.feed_ids(), [post.id])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2, TIMELINE_FANOUT_RESUME=1)
+    def test_fanout_resumes_in_periodic_job(self):
+        """Отписка не дозаполняет ленты, это делает rebalance_timelines."""
+        others = [
+            User.objects.create_user(username=f'other{i}') for i in range(2)
+        ]
+        for user in (self.reader, *others):
+            Follow.objects.create(user=user, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.assertFalse(Timeline.objects.filter(post=post).exists())
+        for user in others:
+            Follow.objects.get(user=user).delete()
+        # Подписчиков уже не больше лимита, но запрос ленты не трогает.
+        self.assertFalse(Timeline.objects.filter(post=post).exists())
+        self.assertEqual(self.feed_ids(), [post.id])
+        out = StringIO()
+        call_command('rebalance_timelines', stdout=out)
+        self.assertIn('Рассылка возвращена авторам: 1', out.getvalue())
+        self.assertFalse(Profile.objects.get(user=self.author).timeline_pulled)
+        self.assertTrue(
+            Timeline.objects.filter(user=self.reader, post=post).exists()
+        )
+        cache.clear()
+        self.assertEqual(self.feed_ids(), [post.id])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2, TIMELINE_FANOUT_RESUME=1)
+    def test_fanout_is_not_resumed_at_the_limit(self):
+        """Зазор между порогами: у границы автор остаётся «на лету»."""
+        others = [
+            User.objects.create_user(username=f'other{i}') for i in range(2)
+        ]
+        for user in (self.reader, *others):
+            Follow.objects.create(user=user, author=self.author)
+        Follow.objects.get(user=others[0]).delete()
+        call_command('rebalance_timelines', stdout=StringIO())
+        self.assertTrue(Profile.objects.get(user=self.author).timeline_pulled)
+
+    @override_settings(FEED_PAGINATION='cursor', PAGE_SIZE=2)
+    def test_cursor_pages_walk_the_timeline(self):
+        """Курсор ленты подписок идёт по Timeline без пропусков и повторов."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text='Пост')
+            for _ in range(5)
+        ]
+        url = reverse('posts:follow_index')
+        seen = []
+        params = {}
+        while True:
+            page_obj = self.reader_client.get(url, params).context['page_obj']
+            seen.extend(post.id for post in page_obj)
+            if not page_obj.has_next():
+                break
+            params = {'after': page_obj.next_cursor}
+        self.assertEqual(seen, [post.id for post in reversed(posts)])
+        page_obj = self.reader_client.get(
+            url, {'before': page_obj.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            [post.id for post in page_obj],
+            [posts[2].id, posts[1].id]
+        )
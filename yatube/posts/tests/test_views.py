@@ -1,14 +1,22 @@
+from http import HTTPStatus
+
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase, override_settings
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django import forms
 
 import shutil
 import tempfile
+from unittest import mock
 
-from posts.models import Group, Post, Follow
+from posts.models import Comment, Group, Post, Follow
+from posts.utils import FeedPaginator
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -281,3 +289,262 @@ class PaginatorViewsTest(TestCase):
                 template + '?page=2'
             )
             self.assertEqual(len(response.context['page_obj']), count_posts)
+
+    @override_settings(FEED_PAGINATION='cursor')
+    def test_cursor_pages_cover_whole_feed(self):
+        """Keyset-пагинация проходит ленту без пропусков и повторов."""
+        templates_pages_names = [
+            reverse('posts:index'),
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': self.group.slug}),
+            reverse(
+                'posts:profile',
+                kwargs={'username': self.user.username})
+        ]
+        expected = list(Post.objects.values_list('id', flat=True))
+        for template in templates_pages_names:
+            with self.subTest(template=template):
+                response = self.authorized_client.get(template)
+                first_page = response.context['page_obj']
+                self.assertFalse(first_page.has_previous())
+                response = self.authorized_client.get(
+                    template + '?after=' + first_page.next_cursor
+                )
+                second_page = response.context['page_obj']
+                self.assertFalse(second_page.has_next())
+                self.assertEqual(
+                    [post.id for post in first_page]
+                    + [post.id for post in second_page],
+                    expected
+                )
+                response = self.authorized_client.get(
+                    template + '?before=' + second_page.previous_cursor
+                )
+                self.assertEqual(
+                    [post.id for post in response.context['page_obj']],
+                    [post.id for post in first_page]
+                )
+
+    def test_broken_cursor_returns_first_page(self):
+        response = self.authorized_client.get(
+            reverse('posts:index') + '?after=broken'
+        )
+        self.assertEqual(
+            len(response.context['page_obj']), settings.PAGE_SIZE
+        )
+
+
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Текст')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(settings.COMMENTS_PAGE_SIZE * 2 + 3)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_shows_first_comments(self):
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), settings.COMMENTS_PAGE_SIZE)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, 'comments-more')
+
+    def test_fragments_cover_all_comments_in_order(self):
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+        texts = []
+        after = None
+        while True:
+            response = self.client.get(url, {'after': after} if after else {})
+            self.assertTemplateUsed(
+                response, 'posts/includes/comment_list.html'
+            )
+            comments = response.context['comments']
+            texts.extend(comment.text for comment in comments)
+            if not comments.has_next():
+                break
+            after = comments.next_cursor
+        self.assertEqual(texts, list(
+            self.post.comments.order_by('pub_date', 'id').values_list(
+                'text', flat=True
+            )
+        ))
+        self.assertNotContains(response, 'comments-more')
+
+    def test_comments_of_missing_post_are_not_found(self):
+        url = reverse(
+            'posts:post_comments', kwargs={'post_id': self.post.id + 1}
+        )
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.NOT_FOUND
+        )
+        self.client.force_login(self.user)
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.NOT_FOUND
+        )
+
+
+class QueryBudgetTest(TestCase):
+    """Число запросов страницы не зависит от числа постов на ней."""
+    QUERY_BUDGETS = {
+        'posts:index': 5,
+        'posts:group_list': 6,
+        'posts:profile': 6,
+        'posts:follow_index': 7,
+        'posts:post_detail': 4,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def get_urls(self, post):
+        return {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}
+            ),
+            'posts:profile': reverse(
+                'posts:profile', kwargs={'username': self.user.username}
+            ),
+            'posts:follow_index': reverse('posts:follow_index'),
+            'posts:post_detail': reverse(
+                'posts:post_detail', kwargs={'post_id': post.id}
+            ),
+        }
+
+    def create_posts(self, count):
+        for _ in range(count):
+            post = Post.objects.create(
+                author=self.user,
+                text='Текст',
+                group=self.group
+            )
+            Comment.objects.create(
+                post=post,
+                author=self.reader,
+                text='Комментарий'
+            )
+        Comment.objects.update(post=post)
+        return post
+
+    def test_feeds_stay_within_query_budget(self):
+        for count in (1, settings.PAGE_SIZE + 3):
+            post = self.create_posts(count)
+            for name, url in self.get_urls(post).items():
+                with self.subTest(view=name, posts=count):
+                    cache.clear()
+                    with self.assertNumQueries(self.QUERY_BUDGETS[name]):
+                        self.authorized_client.get(url)
+
+
+class FeedPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        for _ in range(settings.PAGE_SIZE * 3):
+            Post.objects.create(author=cls.user, text='Текст')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_is_cached_until_posts_change(self):
+        """Число постов берётся из кэша и сбрасывается новым постом."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        # Валидатор ETag и сами посты страницы, без COUNT(*).
+        with self.assertNumQueries(2):
+            response = self.client.get(url + '?page=2')
+        self.assertEqual(
+            response.context['page_obj'].paginator.count,
+            settings.PAGE_SIZE * 3
+        )
+        Post.objects.create(author=self.user, text='Текст')
+        response = self.client.get(url + '?page=2')
+        self.assertEqual(
+            response.context['page_obj'].paginator.count,
+            settings.PAGE_SIZE * 3 + 1
+        )
+
+    def test_count_survives_edits_and_comments(self):
+        """Правки и комментарии не сбрасывают закэшированное число постов."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        post = Post.objects.first()
+        post.text = 'Правка'
+        post.save()
+        Comment.objects.create(post=post, author=self.user, text='Ого')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url + '?page=2')
+        self.assertFalse(any(
+            'COUNT(' in query['sql'] for query in queries
+        ))
+        self.assertEqual(
+            response.context['page_obj'].paginator.count,
+            settings.PAGE_SIZE * 3
+        )
+
+    @override_settings(FEED_COUNT_LIMIT=settings.PAGE_SIZE * 2)
+    def test_large_feed_count_is_approximate(self):
+        response = self.client.get(reverse('posts:index'))
+        paginator = response.context['page_obj'].paginator
+        self.assertTrue(paginator.approximate)
+        self.assertEqual(paginator.num_pages, 2)
+        self.assertNotContains(response, 'Последняя')
+
+
+@override_settings(FEED_COUNT_LIMIT=10 ** 9)
+class PageRangeRenderTest(SimpleTestCase):
+    """Пагинатор не перебирает все страницы; время — benchmark_paginator."""
+
+    def render(self, num_pages, number):
+        paginator = FeedPaginator(range(num_pages * 10), 10)
+        return render_to_string(
+            'posts/includes/paginator.html',
+            {'page_obj': paginator.page(number)}
+        )
+
+    def test_elided_page_range(self):
+        paginator = FeedPaginator(range(500), 10)
+        self.assertEqual(
+            list(paginator.get_elided_page_range(25)),
+            [1, '…', 23, 24, 25, 26, 27, '…', 50]
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(2)),
+            [1, 2, 3, 4, '…', 50]
+        )
+
+    def test_render_does_not_depend_on_page_count(self):
+        small = self.render(20, 10)
+        with mock.patch.object(
+            FeedPaginator,
+            'page_range',
+            new_callable=mock.PropertyMock
+        ) as page_range:
+            large = self.render(50000, 25000)
+        page_range.assert_not_called()
+        self.assertEqual(small.count('<li'), large.count('<li'))
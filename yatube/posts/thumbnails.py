@@ -0,0 +1,182 @@
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedDBStore
+from sorl.thumbnail.models import KVStore
+
+from . import variants
+from .caching import bump, post_scopes
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Все миниатюры, которые показывают шаблоны.
+GEOMETRIES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+# Попадания и промахи пакетного поиска миниатюр в этом процессе; каждые
+# THUMBNAIL_STATS_LOG_EVERY поисков они пишутся в лог.
+stats = Counter()
+
+_executor = None
+_pending = set()
+_lock = Lock()
+
+
+def thumbnail_options(source, options):
+    """Опции миниатюры в том виде, в каком их дополняет бэкенд sorl."""
+    options = dict(options)
+    backend = default.backend
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def thumbnail_key(file_, geometry, options):
+    """Ключ миниатюры в key-value store sorl, без префиксов."""
+    source = ImageFile(file_)
+    options = thumbnail_options(source, options)
+    name = default.backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage).key
+
+
+def ready_thumbnail(file_, geometry, **options):
+    """Готовая миниатюра из key-value store sorl или None, без генерации."""
+    if not file_:
+        return None
+    key = thumbnail_key(file_, geometry, options)
+    instance = getattr(file_, 'instance', None)
+    prefetched = getattr(instance, '_prefetched_thumbnails', {})
+    if key in prefetched:
+        return prefetched[key]
+    return default.kvstore._get(key)
+
+
+def _get_raw_many(keys):
+    """Сырые значения key-value store: один get_many и один запрос к БД."""
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(
+            KVStore.objects.filter(key__in=missing).values_list('key', 'value')
+        )
+        # Как и sorl, запоминаем в кэше отсутствие записи.
+        fetched = {key: found.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(
+            fetched,
+            sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+        )
+        values.update(fetched)
+    return {
+        key: None if value == EMPTY_VALUE else value
+        for key, value in values.items()
+    }
+
+
+def prefetch(posts, geometry, **options):
+    """Находит готовые миниатюры всех постов страницы за раз.
+
+    Результат запоминается на постах, и ready_thumbnail для них больше
+    не ходит в key-value store.
+    """
+    keys = [
+        (post, thumbnail_key(post.image, geometry, options))
+        for post in posts if post.image
+    ]
+    if not keys:
+        return
+    values = _get_raw_many([add_prefix(key) for _, key in keys])
+    for post, key in keys:
+        value = values.get(add_prefix(key))
+        thumbnail = deserialize_image_file(value) if value else None
+        stats['hits' if thumbnail else 'misses'] += 1
+        if not hasattr(post, '_prefetched_thumbnails'):
+            post._prefetched_thumbnails = {}
+        post._prefetched_thumbnails[key] = thumbnail
+    every = settings.THUMBNAIL_STATS_LOG_EVERY
+    lookups = stats['hits'] + stats['misses']
+    if lookups // every > (lookups - len(keys)) // every:
+        log_stats()
+
+
+def log_stats():
+    hits, misses = stats['hits'], stats['misses']
+    logger.info(
+        'Миниатюры: попаданий %s, промахов %s (%.0f%% попаданий)',
+        hits,
+        misses,
+        100 * hits / ((hits + misses) or 1)
+    )
+
+
+def generate(name):
+    try:
+        for geometry, options in GEOMETRIES:
+            get_thumbnail(
+                ImageFile(name, Post.image.field.storage),
+                geometry,
+                **options
+            )
+        variants.build(name)
+        # Страницы с заглушкой вместо картинки пора перерисовать.
+        posts = Post.objects.filter(image=name).values_list(
+            'id', 'author_id', 'group_id'
+        )
+        for post in posts:
+            bump(*post_scopes(*post))
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+        if settings.THUMBNAIL_WORKERS:
+            close_old_connections()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails'
+            )
+    return _executor
+
+
+def submit(name):
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    if settings.THUMBNAIL_WORKERS:
+        get_executor().submit(generate, name)
+    else:
+        generate(name)
+
+
+def enqueue(image):
+    """Ставит генерацию всех миниатюр картинки в фоновый пул."""
+    if image:
+        name = image.name
+        transaction.on_commit(lambda: submit(name))
@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.db.models import F, Q
+
+from . import follows
+from .counters import followers_counts
+from .models import Follow, Post, Profile, Timeline
+
+# Ключ курсора ленты подписок: колонки Timeline, а не Post.
+CURSOR_FIELDS = ('feed_date', 'feed_id')
+
+
+def pulled(author_ids):
+    """Авторы, чьи посты читаются на лету, а не рассылаются по лентам."""
+    return set(Profile.objects.filter(
+        user_id__in=author_ids,
+        timeline_pulled=True
+    ).values_list('user_id', flat=True))
+
+
+def fan_out(post):
+    if pulled([post.author_id]):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    Timeline.objects.bulk_create(
+        [
+            Timeline(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers
+        ],
+        batch_size=500,
+        ignore_conflicts=True
+    )
+
+
+def backfill(user_id, author_id):
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'id', 'pub_date'
+    )[:settings.TIMELINE_BACKFILL_SIZE]
+    Timeline.objects.bulk_create(
+        [
+            Timeline(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        ],
+        batch_size=500,
+        ignore_conflicts=True
+    )
+
+
+def trim(user_id, author_id):
+    Timeline.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id
+    ).delete()
+
+
+def followed(user_id, author_id):
+    if pulled([author_id]):
+        return
+    count = followers_counts([author_id])[author_id]
+    if count > settings.TIMELINE_FANOUT_LIMIT:
+        # Дальше посты автора читаются на лету, ленты не трогаем.
+        Profile.objects.filter(user_id=author_id).update(timeline_pulled=True)
+    else:
+        backfill(user_id, author_id)
+
+
+def unfollowed(user_id, author_id):
+    # Рассылку автору возвращает rebalance(): дозаполнение лент всех
+    # подписчиков слишком дорого для запроса.
+    trim(user_id, author_id)
+
+
+def rebalance(author_ids):
+    """Переключает авторов между рассылкой и чтением на лету.
+
+    Рассылка возвращается только при TIMELINE_FANOUT_RESUME подписчиках,
+    ленты оставшихся подписчиков дозаполняются. Возвращает число авторов,
+    которым вернули рассылку.
+    """
+    Profile.objects.filter(
+        user_id__in=author_ids,
+        timeline_pulled=False,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).update(timeline_pulled=True)
+    resumed = list(Profile.objects.filter(
+        user_id__in=author_ids,
+        timeline_pulled=True,
+        followers_count__lte=settings.TIMELINE_FANOUT_RESUME
+    ).values_list('user_id', flat=True))
+    # Сначала включаем рассылку, чтобы не потерять новые посты.
+    Profile.objects.filter(user_id__in=resumed).update(timeline_pulled=False)
+    edges = Follow.objects.filter(author_id__in=resumed).values_list(
+        'user_id', 'author_id'
+    )
+    for user_id, author_id in edges.iterator():
+        backfill(user_id, author_id)
+    return len(resumed)
+
+
+def follow_feed(user):
+    """Посты ленты подписок с ключом CURSOR_FIELDS, новые первыми.
+
+    Без авторов «на лету» лента листается по индексу Timeline: ключ
+    берётся из той же строки Timeline, что и фильтр по подписчику.
+    """
+    following = sorted(follows.following(user.id))
+    live = sorted(pulled(following))
+    if not live:
+        posts = Post.objects.filter(timeline__user=user).annotate(
+            feed_date=F('timeline__pub_date'),
+            feed_id=F('timeline__post_id')
+        )
+    else:
+        inbox = Timeline.objects.filter(user=user).values('post_id')
+        posts = Post.objects.filter(
+            Q(id__in=inbox) | Q(author_id__in=live)
+        ).annotate(feed_date=F('pub_date'), feed_id=F('id'))
+    return posts.order_by('-feed_date', '-feed_id')
@@ -0,0 +1,77 @@
+"""Обработка загруженных картинок с ограничением памяти.
+
+Размер картинки известен по заголовку ещё до декодирования, поэтому
+слишком большие отклоняются сразу, а крупные декодируются уже
+уменьшенными: JPEG через draft (масштабирование в libjpeg), остальные
+через reduce сразу после декодирования. Результат пишется во временный
+файл, откуда хранилище забирает его без чтения в память.
+"""
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from PIL import Image, ImageOps
+
+# Форматы, в которых перекодированная картинка сохраняется как была.
+KEEP_FORMATS = {'JPEG': 'image/jpeg', 'PNG': 'image/png'}
+
+
+def needs_processing(image):
+    max_width, max_height = settings.IMAGE_INGEST_SIZE
+    width, height = image.size
+    return (
+        width > max_width
+        or height > max_height
+        or bool(image.getexif())
+    )
+
+
+def process_upload(upload):
+    """Проверяет и при необходимости уменьшает загруженную картинку.
+
+    Возвращает исходный файл, если он в пределах размеров и без EXIF,
+    иначе — новый временный файл с тем же именем.
+    """
+    upload.seek(0)
+    with Image.open(upload) as image:
+        width, height = image.size
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            raise ValidationError(
+                'Картинка слишком большая: %(pixels)s Мп, можно не больше '
+                '%(limit)s Мп.',
+                code='too_many_pixels',
+                params={
+                    'pixels': round(width * height / 10 ** 6),
+                    'limit': settings.IMAGE_MAX_PIXELS // 10 ** 6,
+                }
+            )
+        if not needs_processing(image):
+            upload.seek(0)
+            return upload
+        format_ = image.format if image.format in KEEP_FORMATS else 'JPEG'
+        max_width, max_height = settings.IMAGE_INGEST_SIZE
+        scale = min(max_width / width, max_height / height, 1)
+        size = (round(width * scale), round(height * scale))
+        # Для JPEG декодер сразу выдаёт картинку в 2, 4 или 8 раз меньше.
+        image.draft('RGB', size)
+        image.thumbnail(size, Image.LANCZOS, reducing_gap=2.0)
+        # Поворот по EXIF — уже на уменьшенной картинке.
+        image = ImageOps.exif_transpose(image)
+        if format_ == 'JPEG' and image.mode != 'RGB':
+            image = image.convert('RGB')
+        name = os.path.splitext(upload.name)[0] + '.' + format_.lower()
+        processed = TemporaryUploadedFile(
+            name, KEEP_FORMATS.get(format_), 0, None
+        )
+        # Новый файл пишется без EXIF и прочих метаданных.
+        image.save(
+            processed,
+            format_,
+            quality=settings.IMAGE_INGEST_QUALITY,
+            optimize=True,
+            exif=b''
+        )
+    processed.size = processed.tell()
+    processed.seek(0)
+    return processed
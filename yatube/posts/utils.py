@@ -1,9 +1,257 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+
 from django.conf import settings
+from django.core.cache import cache
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .caching import COUNT_SCOPE, generations
+from .models import Comment
+
+COUNT_KEY = 'feed:count:{}:{}'
+
+
+def encode_cursor(pub_date, pk):
+    raw = json.dumps([pub_date.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает пару (pub_date, id) или None для битого токена."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        pub_date, pk = json.loads(raw.decode())
+        pub_date = parse_datetime(pub_date)
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if pub_date is None or not isinstance(pk, int):
+        return None
+    return pub_date, pk
+
+
+class CursorPage(Sequence):
+    """Страница без номера и без общего числа записей."""
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page of %s posts>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset-пагинация по (pub_date, id) без COUNT(*) и OFFSET.
+
+    По умолчанию новые записи идут первыми, как в лентах; ascending=True
+    даёт хронологический порядок, как у комментариев. fields — колонки
+    ключа вместо pub_date и id, например из таблицы ленты подписок: их
+    значения и попадают в курсор.
+    """
+    keyset = True
+
+    def __init__(self, object_list, per_page, ascending=False,
+                 fields=('pub_date', 'id')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ascending = ascending
+        self.fields = fields
+
+    def _ordering(self, forward):
+        if forward == self.ascending:
+            return self.fields
+        return tuple('-' + field for field in self.fields)
 
+    def _seek(self, cursor, forward):
+        """Записи за курсором: дальше по порядку страниц или раньше."""
+        date_field, pk_field = self.fields
+        pub_date, pk = cursor
+        lookup = 'lt' if forward != self.ascending else 'gt'
+        return Q(**{f'{date_field}__{lookup}': pub_date}) | Q(**{
+            date_field: pub_date,
+            f'{pk_field}__{lookup}': pk,
+        })
 
-def paginator_page(posts, request):
-    paginator = Paginator(posts, settings.PAGE_SIZE)
+    def _cursor(self, row):
+        return encode_cursor(*(getattr(row, field) for field in self.fields))
+
+    def get_page(self, after=None, before=None):
+        after = decode_cursor(after) if after else None
+        before = decode_cursor(before) if before else None
+        rows = self.object_list
+        if before is not None:
+            rows = rows.filter(self._seek(before, forward=False))
+            rows = list(
+                rows.order_by(*self._ordering(False))[:self.per_page + 1]
+            )
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_next = True
+        else:
+            if after is not None:
+                rows = rows.filter(self._seek(after, forward=True))
+            rows = list(
+                rows.order_by(*self._ordering(True))[:self.per_page + 1]
+            )
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_previous = after is not None
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self._cursor(rows[-1])
+        if rows and has_previous:
+            previous_cursor = self._cursor(rows[0])
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+
+class FeedPaginator(Paginator):
+    """Paginator с кэшированным и ограниченным сверху COUNT(*).
+
+    Число постов ленты хранится в кэше под поколением её состава: его
+    меняют появление и удаление постов, но не правки и комментарии. Если
+    постов больше FEED_COUNT_LIMIT, они не досчитываются: count
+    становится приблизительным, а число страниц обрезается.
+    """
+
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, scope=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.scope = scope
+        self.approximate = False
+
+    @cached_property
+    def count(self):
+        key = None
+        if self.scope:
+            generation, = generations(COUNT_SCOPE.format(self.scope))
+            key = COUNT_KEY.format(self.scope, generation)
+            cached = cache.get(key)
+            if cached is not None:
+                count, self.approximate = cached
+                return count
+        limit = settings.FEED_COUNT_LIMIT
+        count = Paginator(self.object_list[:limit + 1], self.per_page).count
+        if count > limit:
+            count, self.approximate = limit, True
+        if key:
+            cache.set(
+                key,
+                (count, self.approximate),
+                settings.FEED_CACHE_TIMEOUT
+            )
+        return count
+
+    def get_elided_page_range(self, number=1, *, on_each_side=2, on_ends=1):
+        """Окно номеров страниц вокруг текущей, как в Django 3.2.
+
+        Размер окна не зависит от числа страниц; у приблизительно
+        посчитанной ленты хвост из последних страниц не показывается.
+        """
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > (1 + on_each_side + on_ends) + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if self.approximate:
+            yield from range(
+                number + 1,
+                min(number + on_each_side, self.num_pages) + 1
+            )
+            yield self.ELLIPSIS
+        elif number < (self.num_pages - on_each_side - on_ends) - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1, self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+
+class AdminPaginator(Paginator):
+    """Paginator для changelist больших таблиц.
+
+    COUNT(*) не досчитывается дальше ADMIN_COUNT_LIMIT, и страницы есть
+    только для первых ADMIN_COUNT_LIMIT строк: дальние строки находятся
+    через date_hierarchy, фильтры, поиск или обратную сортировку, а
+    changelist показывает число как «100000+». Страница выбирается в
+    два шага: сначала id её строк по индексу, без join и широких колонок,
+    затем полные строки с join только для этих id.
+    """
+
+    @cached_property
+    def counted(self):
+        """Число строк, но не больше ADMIN_COUNT_LIMIT + 1."""
+        limit = settings.ADMIN_COUNT_LIMIT
+        return Paginator(self.object_list[:limit + 1], self.per_page).count
+
+    @property
+    def count(self):
+        return min(self.counted, settings.ADMIN_COUNT_LIMIT)
+
+    @property
+    def capped(self):
+        return self.counted > settings.ADMIN_COUNT_LIMIT
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        ids = list(self.object_list.values_list('pk', flat=True)[
+            bottom:bottom + self.per_page
+        ])
+        return self._get_page(
+            self.object_list.filter(pk__in=ids),
+            number,
+            self
+        )
+
+
+def paginator_page(posts, request, scope=None, fields=('pub_date', 'id')):
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if settings.FEED_PAGINATION == 'cursor' or after or before:
+        paginator = CursorPaginator(posts, settings.PAGE_SIZE, fields=fields)
+        return paginator.get_page(after=after, before=before)
+    paginator = FeedPaginator(posts, settings.PAGE_SIZE, scope=scope)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+def comments_page(post_id, after=None):
+    """Комментарии поста по порядку, вместе с авторами, одним запросом."""
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    )
+    paginator = CursorPaginator(
+        comments,
+        settings.COMMENTS_PAGE_SIZE,
+        ascending=True
+    )
+    return paginator.get_page(after=after)
@@ -0,0 +1,189 @@
+"""Адаптивные копии картинок постов: несколько ширин и форматов.
+
+Pillow нагружает процессор, поэтому кодирование идёт в пуле процессов,
+по задаче на каждую ширину и формат; в процесс пула уходят только байты,
+без Django и базы.
+"""
+import io
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from threading import Lock
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .models import ImageVariant, Post
+
+# Пропорции карточки поста, как у миниатюры 960x339.
+RATIO = 339 / 960
+# Формат Pillow, MIME-тип и расширение; сначала самые экономные.
+FORMATS = (
+    ('AVIF', 'image/avif', 'avif'),
+    ('WEBP', 'image/webp', 'webp'),
+    ('JPEG', 'image/jpeg', 'jpg'),
+)
+
+# Тег EXIF Orientation и его значения, при которых стороны меняются местами.
+ORIENTATION = 0x0112
+TRANSPOSED = (5, 6, 7, 8)
+
+_pool = None
+_lock = Lock()
+
+
+def available_formats():
+    """Форматы, которые умеет сохранять установленный Pillow."""
+    Image.init()
+    return [format_ for format_ in FORMATS if format_[0] in Image.SAVE]
+
+
+def variant_widths(data, widths):
+    """Ширины вариантов: больше исходной не нужны, кроме самой маленькой.
+
+    Читается только заголовок картинки; повёрнутые EXIF-ом снимки
+    меряются по высоте.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        width, height = image.size
+        if image.getexif().get(ORIENTATION) in TRANSPOSED:
+            width = height
+    return [size for size in widths if size <= width] or list(widths[:1])
+
+
+def render_variant(data, width, format_, quality):
+    """Обрезает картинку под карточку ширины width и кодирует в format_."""
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGB')
+        size = (width, round(width * RATIO))
+        resized = ImageOps.fit(image, size, Image.LANCZOS)
+        if format_ == 'JPEG':
+            resized = resized.convert('RGB')
+        buffer = io.BytesIO()
+        resized.save(buffer, format_, quality=quality)
+    return buffer.getvalue()
+
+
+def render(data, widths, formats, quality, pool=None):
+    """Все варианты картинки: (ширина, MIME-тип, расширение, байты).
+
+    С пулом каждая пара ширины и формата — отдельная задача, и
+    кодирование одной картинки расходится по всем ядрам.
+    """
+    jobs = [
+        (width, format_)
+        for width in variant_widths(data, widths)
+        for format_ in formats
+    ]
+    if pool is None:
+        contents = [
+            render_variant(data, width, format_[0], quality)
+            for width, format_ in jobs
+        ]
+    else:
+        futures = [
+            pool.submit(render_variant, data, width, format_[0], quality)
+            for width, format_ in jobs
+        ]
+        contents = [future.result() for future in futures]
+    return [
+        (width, mime_type, extension, content)
+        for (width, (_, mime_type, extension)), content in zip(jobs, contents)
+    ]
+
+
+def get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            # fork из многопоточного процесса сервера может унести в
+            # потомка чужие захваченные блокировки. Процессы forkserver
+            # чистые, но модуль с задачей импортируют заново — отсюда
+            # django.setup().
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_PROCESSES or None,
+                mp_context=get_context('forkserver'),
+                initializer=django.setup
+            )
+    return _pool
+
+
+def build(name):
+    """Создаёт варианты картинки рядом с оригиналом, если их ещё нет."""
+    if ImageVariant.objects.filter(source=name).exists():
+        return
+    with Post.image.field.storage.open(name) as source:
+        data = source.read()
+    args = (
+        data,
+        tuple(settings.IMAGE_VARIANT_WIDTHS),
+        available_formats(),
+        settings.IMAGE_VARIANT_QUALITY,
+    )
+    pool = None
+    if settings.IMAGE_VARIANT_PROCESSES != 0:
+        pool = get_pool()
+    results = render(*args, pool=pool)
+    stem = os.path.splitext(name)[0]
+    variants = []
+    for width, mime_type, extension, content in results:
+        path = default_storage.save(
+            f'{stem}_{width}w.{extension}',
+            ContentFile(content)
+        )
+        variants.append(ImageVariant(
+            source=name,
+            width=width,
+            mime_type=mime_type,
+            file=path
+        ))
+    ImageVariant.objects.bulk_create(variants, ignore_conflicts=True)
+
+
+def delete(name):
+    """Удаляет варианты картинки вместе с файлами."""
+    found = ImageVariant.objects.filter(source=name)
+    for variant in found:
+        variant.file.delete(save=False)
+    found.delete()
+
+
+def prefetch(posts):
+    """Загружает варианты картинок всех постов страницы одним запросом."""
+    posts = [post for post in posts if post.image]
+    if not posts:
+        return
+    found = defaultdict(list)
+    variants = ImageVariant.objects.filter(
+        source__in={post.image.name for post in posts}
+    ).order_by('width')
+    for variant in variants:
+        found[variant.source].append(variant)
+    for post in posts:
+        post._image_variants = found[post.image.name]
+
+
+def sources(image):
+    """Элементы <source> для <picture>, лучшие форматы первыми."""
+    if not image:
+        return []
+    variants = getattr(image.instance, '_image_variants', None)
+    if variants is None:
+        variants = ImageVariant.objects.filter(
+            source=image.name
+        ).order_by('width')
+    srcsets = defaultdict(list)
+    for variant in variants:
+        srcsets[variant.mime_type].append(
+            f'{variant.file.url} {variant.width}w'
+        )
+    return [
+        {'type': mime_type, 'srcset': ', '.join(srcsets[mime_type])}
+        for _, mime_type, _ in FORMATS if mime_type in srcsets
+    ]
@@ -1,61 +1,122 @@
 from django.contrib.auth.decorators import login_required
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render, redirect
 
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import paginator_page
-
-
+from .caching import (
+    cache_anonymous,
+    card_cache_context,
+    group_state,
+    index_state,
+    popular_state,
+    post_state,
+    profile_state
+)
+from . import export, follows, popular, search, suggestions, thumbnails
+from .forms import CommentForm, PostForm, SearchForm
+from .models import Group, Post, User
+from .timeline import CURSOR_FIELDS, follow_feed
+from .utils import comments_page, paginator_page
+
+
+@cache_anonymous(index_state)
 def index(request):
-    posts = Post.objects.all()
-    page_obj = paginator_page(posts, request)
+    posts = Post.objects.for_feed()
+    page_obj = paginator_page(posts, request, 'index')
     context = {
         'page_obj': page_obj,
+        'followed_authors': follows.following(request.user.id),
+        **card_cache_context(page_obj),
     }
     return render(request, 'posts/index.html', context)
 
 
+@cache_anonymous(popular_state)
+def popular_posts(request):
+    page_obj = popular.page(request)
+    context = {
+        'page_obj': page_obj,
+        'followed_authors': follows.following(request.user.id),
+        **card_cache_context(page_obj),
+    }
+    return render(request, 'posts/popular.html', context)
+
+
+@cache_anonymous(group_state)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    page_obj = paginator_page(posts, request)
+    posts = group.posts.for_feed()
+    page_obj = paginator_page(posts, request, f'group:{group.id}')
     context = {
         'group': group,
         'page_obj': page_obj,
+        'followed_authors': follows.following(request.user.id),
+        **card_cache_context(page_obj),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@cache_anonymous(profile_state)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    page_obj = paginator_page(posts, request)
-    following = False
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user,
-            author=author
-        ).exists()
+    author = get_object_or_404(
+        User.objects.select_related('profile'),
+        username=username
+    )
+    posts = author.posts.for_feed()
+    page_obj = paginator_page(posts, request, f'author:{author.id}')
     context = {
         'author': author,
         'page_obj': page_obj,
-        'following': following
+        'following': follows.is_following(request.user, [author.id])[
+            author.id
+        ],
+        'is_author': author == request.user,
+        **card_cache_context(page_obj),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@cache_anonymous(post_state)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__profile', 'group'),
+        id=post_id
+    )
     form = CommentForm(request.POST or None)
     context = {
         'post': post,
         'form': form,
-        'comments': comments
+        'comments': comments_page(post.id),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@cache_anonymous(post_state)
+def post_comments(request, post_id):
+    """Следующая страница комментариев фрагментом HTML."""
+    get_object_or_404(Post.objects.only('id'), id=post_id)
+    context = {
+        'post_id': post_id,
+        'comments': comments_page(post_id, request.GET.get('after')),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+def search_posts(request):
+    form = SearchForm(request.GET or None)
+    page_obj = None
+    if form.is_valid():
+        page_obj = search.page(
+            form.cleaned_data['q'],
+            after=request.GET.get('after')
+        )
+    context = {
+        'form': form,
+        'page_obj': page_obj,
+        **card_cache_context(page_obj),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -68,6 +129,7 @@ def post_create(request):
     post = form.save(commit=False)
     post.author = request.user
     post.save()
+    thumbnails.enqueue(post.image)
     return redirect('posts:profile', post.author.username)
 
 
@@ -88,7 +150,9 @@ def post_edit(request, post_id):
             {'form': form}
         )
     post = form.save(commit=False)
-    post.save()
+    post.save(update_fields=PostForm.Meta.fields)
+    if 'image' in form.changed_data:
+        thumbnails.enqueue(post.image)
     return redirect('posts:post_detail', post_id=post.id)
 
 
@@ -111,24 +175,65 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator_page(posts, request)
+    posts = follow_feed(request.user).for_feed()
+    page_obj = paginator_page(posts, request, fields=CURSOR_FIELDS)
     context = {
         'page_obj': page_obj,
+        'suggestions': suggestions.for_user(request.user),
+        **card_cache_context(page_obj),
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
-    if author != request.user:
-        Follow.objects.get_or_create(user=request.user, author=author)
+    author_id = get_object_or_404(
+        User.objects.values_list('id', flat=True),
+        username=username
+    )
+    follows.follow(request.user.id, author_id)
     return redirect('posts:profile', username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
-    Follow.objects.filter(user=request.user, author=author).delete()
+    author_id = get_object_or_404(
+        User.objects.values_list('id', flat=True),
+        username=username
+    )
+    follows.unfollow(request.user.id, author_id)
     return redirect('posts:profile', username)
+
+
+def export_response(request, posts, filename):
+    """Отдаёт посты и комментарии файлом, не собирая его в памяти."""
+    format_ = request.GET.get('format')
+    if format_ not in export.FORMATS:
+        format_ = 'jsonl'
+    lines, content_type = export.FORMATS[format_]
+    response = StreamingHttpResponse(
+        lines(export.records(posts)),
+        content_type=content_type
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{filename}.{format_}"'
+    )
+    return response
+
+
+@login_required
+def profile_export(request, username):
+    """Выгрузка доступна самому автору и персоналу."""
+    author = get_object_or_404(User, username=username)
+    if author != request.user and not request.user.is_staff:
+        return redirect('posts:profile', username=author.username)
+    return export_response(request, author.posts.all(), author.username)
+
+
+@login_required
+def group_export(request, slug):
+    """Выгрузка группы доступна только персоналу."""
+    group = get_object_or_404(Group, slug=slug)
+    if not request.user.is_staff:
+        return redirect('posts:group_list', slug=group.slug)
+    return export_response(request, group.posts.all(), group.slug)
@@ -17,8 +17,22 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 60,
+            'POLL_INTERVAL': 1,
+        },
+    },
+    # Общий для всех процессов уровень; в проде — сетевое хранилище
+    'shared': {
+        'BACKEND': 'core.cache.SharedFileCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
 }
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
@@ -61,6 +75,13 @@ INSTALLED_APPS = [
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Кто отдаёт файлы медиа: None — сам Django, 'x-accel-redirect' — nginx,
+# 'x-sendfile' — Apache с mod_xsendfile
+MEDIA_SENDFILE = None
+# Внутренний location nginx, который смотрит в MEDIA_ROOT
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+# Сколько кэшировать файлы медиа, имена которых не зависят от содержимого
+MEDIA_MAX_AGE = 60 * 60 * 24
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
@@ -150,3 +171,72 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 PAGE_SIZE = 10
+
+COMMENTS_PAGE_SIZE = 20
+
+# 'page' — нумерованные страницы, 'cursor' — keyset-пагинация (?after=/?before=)
+FEED_PAGINATION = 'page'
+
+# Авторы с большим числом подписчиков не рассылаются по лентам подписок
+TIMELINE_FANOUT_LIMIT = 1000
+# Рассылка возвращается, когда подписчиков становится не больше этого
+# числа: зазор с TIMELINE_FANOUT_LIMIT гасит переключения на границе
+TIMELINE_FANOUT_RESUME = 900
+# Сколько последних постов автора попадает в ленту при подписке
+TIMELINE_BACKFILL_SIZE = 500
+
+# Фрагменты лент сбрасываются счётчиками поколений, поэтому живут долго
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Множество подписок пользователя сбрасывается при подписке и отписке
+FOLLOWING_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Сколько рекомендаций авторов хранить на пользователя и показывать в виджете
+SUGGESTIONS_LIMIT = 20
+SUGGESTIONS_SHOWN = 5
+
+# Дальше этого числа посты ленты не досчитываются
+FEED_COUNT_LIMIT = 10000
+
+# Дальше этого числа строки в changelist админки не досчитываются
+ADMIN_COUNT_LIMIT = 100000
+
+# Лента популярного: за столько секунд вклад комментария падает вдвое
+POPULAR_HALF_LIFE = 60 * 60 * 12
+# Сколько постов хранит рассчитанная лента
+POPULAR_SIZE = 500
+# Меньшие оценки обнуляются, чтобы затухание не трогало старые посты
+POPULAR_MIN_SCORE = 0.01
+# Пересчёт с нуля учитывает комментарии за столько периодов полураспада
+POPULAR_REBUILD_HALF_LIVES = 10
+
+# Потоки фоновой генерации миниатюр; 0 — генерировать сразу в запросе
+THUMBNAIL_WORKERS = 2
+# Каждые столько поисков миниатюр процесс пишет в лог долю попаданий
+THUMBNAIL_STATS_LOG_EVERY = 1000
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'posts': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
+
+# Ширины и качество адаптивных вариантов картинок постов
+IMAGE_VARIANT_WIDTHS = (480, 960, 1440)
+IMAGE_VARIANT_QUALITY = 80
+# Процессы для кодирования вариантов; None — по числу ядер, 0 — без пула
+IMAGE_VARIANT_PROCESSES = None
+
+# Загрузки больше IMAGE_MAX_PIXELS отклоняются, больше IMAGE_INGEST_SIZE
+# уменьшаются при сохранении
+IMAGE_MAX_PIXELS = 100 * 10 ** 6
+IMAGE_INGEST_SIZE = (2560, 2560)
+IMAGE_INGEST_QUALITY = 85
@@ -0,0 +1,26 @@
+"""Настройки для тестов: отдельный кэш, без фоновых потоков и процессов."""
+import atexit
+import shutil
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES, LOGGING
+
+CACHE_DIR = tempfile.mkdtemp(prefix='yatube-test-cache-')
+atexit.register(shutil.rmtree, CACHE_DIR, ignore_errors=True)
+
+CACHES = {
+    **CACHES,
+    'shared': {**CACHES['shared'], 'LOCATION': CACHE_DIR},
+}
+
+# Фоновые потоки и пул процессов мешали бы откату тестовой базы
+THUMBNAIL_WORKERS = 0
+IMAGE_VARIANT_PROCESSES = 0
+
+LOGGING = {
+    **LOGGING,
+    'loggers': {
+        'posts': {**LOGGING['loggers']['posts'], 'level': 'WARNING'},
+    },
+}